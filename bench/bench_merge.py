@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la fusión/deduplicación de relaciones.
+
+Mide EnhancedEntityRelationshipExtractor._merge_relationships con datos
+sintéticos (100, 1k y 10k relaciones por defecto) para comprobar si el paso
+de fusión es relevante frente a las llamadas al LLM antes de optimizarlo.
+
+Uso:
+    python bench/bench_merge.py [--sizes 100 1000 10000] [--repeat 5]
+"""
+
+import argparse
+import copy
+import os
+import sys
+import timeit
+
+# Permitir ejecutar el script desde la raíz del repositorio o desde bench/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entity_extractor_improved import EnhancedEntityRelationshipExtractor
+
+ENTITY_TYPES = ("Person", "Organization", "Location", "Event")
+
+def make_relationships(count: int, duplicate_ratio: float = 0.3):
+    """Genera relaciones sintéticas con una fracción de duplicados."""
+    unique = max(1, int(count * (1 - duplicate_ratio)))
+    relationships = []
+    for i in range(count):
+        n = i % unique
+        relationships.append({
+            "subject": {"type": ENTITY_TYPES[n % len(ENTITY_TYPES)], "name": f"Entity {n}"},
+            "action": f"action_{n % 17}",
+            "object": {"type": ENTITY_TYPES[(n + 1) % len(ENTITY_TYPES)], "name": f"Entity {n + 1}"},
+            "category": "interaction"
+        })
+    return relationships
+
+def bench(size: int, repeat: int) -> float:
+    """Devuelve el mejor tiempo (segundos) de fusionar size explícitas + size inferidas."""
+    # Sin __init__: no hace falta proveedor ni configuración para la fusión
+    extractor = EnhancedEntityRelationshipExtractor.__new__(EnhancedEntityRelationshipExtractor)
+    explicit = make_relationships(size)
+    inferred = make_relationships(size)
+
+    # La fusión modifica 'source' en las relaciones: cada ejecución usa copias nuevas
+    timer = timeit.Timer(
+        "merge(e, i)",
+        setup="e = copy.deepcopy(explicit); i = copy.deepcopy(inferred)",
+        globals={
+            "merge": extractor._merge_relationships,
+            "copy": copy,
+            "explicit": explicit,
+            "inferred": inferred
+        }
+    )
+    return min(timer.repeat(repeat=repeat, number=1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de _merge_relationships")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Número de relaciones explícitas (e inferidas) por caso")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por caso (se toma el mínimo)")
+    args = parser.parse_args()
+
+    print(f"{'relaciones':>12} {'mejor (ms)':>12} {'us/relación':>12}")
+    for size in args.sizes:
+        best = bench(size, args.repeat)
+        total = 2 * size
+        print(f"{total:>12} {best * 1000:>12.3f} {best * 1e6 / total:>12.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,12 @@ Configuración centralizada para el sistema de extracción de entidades.
 Maneja múltiples proveedores de LLM y configuraciones de la aplicación.
 """
 
+import importlib.util
 import os
-from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
 from dotenv import load_dotenv
 import logging
 
@@ -13,59 +17,72 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Comprobar una sola vez si boto3 está disponible, sin importarlo
+_HAS_BOTO3 = importlib.util.find_spec("boto3") is not None
+
+@dataclass(frozen=True)
+class _EnvSnapshot:
+    """Variables de entorno que sobrescriben la configuración de los proveedores, leídas una sola vez."""
+    
+    # dataclass(slots=True) requiere Python 3.10; se declaran a mano
+    __slots__ = ("azure_deployment_name", "default_aws_model")
+    
+    azure_deployment_name: Optional[str]
+    default_aws_model: Optional[str]
+    
+    @classmethod
+    def from_environ(cls) -> "_EnvSnapshot":
+        """Lee las variables de entorno actuales."""
+        return cls(
+            azure_deployment_name=os.getenv("AZURE_DEPLOYMENT_NAME"),
+            default_aws_model=os.getenv("DEFAULT_AWS_MODEL")
+        )
+
+_ENV = _EnvSnapshot.from_environ()
+
 class LLMConfig:
     """Configuración para diferentes proveedores de LLM."""
     
     # Configuraciones por defecto para cada proveedor
     DEFAULT_CONFIGS = {
-        "anthropic": {
+        "anthropic": MappingProxyType({
             "model": "claude-3-5-haiku-20241022",
             "temperature": 0,
             "max_tokens": 8192,
             "relationship_temperature": 0.2,
-            "relationship_max_tokens": 4096
-        },
-        "azure_openai": {
+            "relationship_max_tokens": 4096,
+            "max_chunk_chars": 24000,
+            "stream": True
+        }),
+        "azure_openai": MappingProxyType({
             "model": "gpt-4o-mini",
             "temperature": 0,
             "max_tokens": 8192,
             "relationship_temperature": 0.2,
-            "relationship_max_tokens": 4096
-        },
-        "aws_bedrock": {
+            "relationship_max_tokens": 4096,
+            "max_chunk_chars": 24000,
+            "stream": True
+        }),
+        "aws_bedrock": MappingProxyType({
             "model": "anthropic.claude-3-haiku-20240307-v1:0",
             "temperature": 0,
             "max_tokens": 8192,
             "relationship_temperature": 0.2,
-            "relationship_max_tokens": 4096
-        }
+            "relationship_max_tokens": 4096,
+            "max_chunk_chars": 24000,
+            "stream": True
+        })
     }
     
     @classmethod
-    def get_provider_config(cls, provider: str) -> Dict[str, Any]:
-        """Obtiene la configuración para un proveedor específico."""
-        if provider not in cls.DEFAULT_CONFIGS:
-            raise ValueError(f"Proveedor no soportado: {provider}")
-        
-        config = cls.DEFAULT_CONFIGS[provider].copy()
-        
-        # Sobrescribir con configuraciones específicas del entorno
-        if provider == "azure_openai":
-            deployment_name = os.getenv("AZURE_DEPLOYMENT_NAME")
-            if deployment_name:
-                config["model"] = deployment_name
-        
-        elif provider == "aws_bedrock":
-            aws_model = os.getenv("DEFAULT_AWS_MODEL")
-            if aws_model:
-                config["model"] = aws_model
-        
-        return config
+    def get_provider_config(cls, provider: str) -> Mapping[str, Any]:
+        """Obtiene la configuración (inmutable y cacheada) para un proveedor específico."""
+        return _get_provider_config(provider)
     
     @classmethod
-    def get_available_providers(cls) -> list:
+    def get_available_providers(cls) -> Tuple[str, ...]:
         """Retorna la lista de proveedores disponibles."""
-        return list(cls.DEFAULT_CONFIGS.keys())
+        return _get_available_providers()
 
 class AppConfig:
     """Configuración general de la aplicación."""
@@ -74,6 +91,16 @@ class AppConfig:
     NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
     NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
     NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+    # Base de datos de las sesiones; nombrarla evita que el driver resuelva la predeterminada en cada sesión
+    NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+    
+    # Pool de conexiones del driver de Neo4j (tiempos en segundos)
+    NEO4J_POOL = int(os.getenv("NEO4J_POOL", 50))
+    NEO4J_MAX_CONNECTION_LIFETIME = int(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", 600))
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT = int(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 60))
+    NEO4J_CONNECTION_TIMEOUT = int(os.getenv("NEO4J_CONNECTION_TIMEOUT", 15))
+    # Tiempo máximo reintentando una transacción de execute_read/execute_write ante fallos transitorios
+    NEO4J_MAX_TRANSACTION_RETRY_TIME = int(os.getenv("NEO4J_MAX_TRANSACTION_RETRY_TIME", 30))
     
     # Configuración de Flask
     FLASK_PORT = int(os.getenv("FLASK_PORT", 5000))
@@ -95,6 +122,25 @@ class AppConfig:
     AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
     DEFAULT_AWS_MODEL = os.getenv("DEFAULT_AWS_MODEL", "anthropic.claude-3-haiku-20240307-v1:0")
     
+    # Directorio de la caché de respuestas del LLM (vacío = desactivada)
+    LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+    
+    # Directorio de la caché de relaciones inferidas por conjunto de entidades (vacío = solo en memoria)
+    LLM_INFERENCE_CACHE_DIR = os.getenv("LLM_INFERENCE_CACHE_DIR", ".llm_cache/inference")
+    
+    # Indica si validate_config ya se ejecutó con éxito en este proceso
+    _validated = False
+    
+    @classmethod
+    def is_validated(cls) -> bool:
+        """Indica si la configuración ya fue validada con éxito."""
+        return cls._validated
+    
+    @classmethod
+    def invalidate(cls) -> None:
+        """Olvida la validación previa (útil en tests que cambian la configuración)."""
+        cls._validated = False
+    
     @classmethod
     def validate_config(cls) -> bool:
         """Valida que la configuración sea correcta."""
@@ -118,9 +164,7 @@ class AppConfig:
                 errors.append("AZURE_OPENAI_ENDPOINT no está configurado")
         elif cls.DEFAULT_LLM_PROVIDER == "aws_bedrock":
             # Para AWS Bedrock, verificamos que boto3 esté disponible
-            try:
-                import boto3
-            except ImportError:
+            if not _HAS_BOTO3:
                 errors.append("boto3 no está instalado (requerido para AWS Bedrock)")
         
         if errors:
@@ -129,11 +173,17 @@ class AppConfig:
                 logger.error(f"  - {error}")
             return False
         
+        cls._validated = True
         return True
     
     @classmethod
-    def get_llm_credentials(cls, provider: str) -> Dict[str, Any]:
-        """Obtiene las credenciales para un proveedor específico."""
+    def get_llm_credentials(cls, provider: str) -> Mapping[str, Any]:
+        """Obtiene las credenciales (inmutables y cacheadas) para un proveedor específico."""
+        return _get_llm_credentials(provider)
+    
+    @classmethod
+    def _build_llm_credentials(cls, provider: str) -> Dict[str, Any]:
+        """Construye las credenciales para un proveedor específico."""
         credentials = {}
         
         if provider == "anthropic":
@@ -165,34 +215,86 @@ class AppConfig:
         
         return credentials
 
-# Configuración global
-def get_config() -> Dict[str, Any]:
-    """Obtiene toda la configuración de la aplicación."""
-    return {
-        "neo4j": {
+@lru_cache(maxsize=None)
+def _get_provider_config(provider: str) -> Mapping[str, Any]:
+    """Construye una sola vez por proceso la configuración de un proveedor."""
+    if provider not in LLMConfig.DEFAULT_CONFIGS:
+        raise ValueError(f"Proveedor no soportado: {provider}")
+    
+    config = LLMConfig.DEFAULT_CONFIGS[provider].copy()
+    
+    # Sobrescribir con configuraciones específicas del entorno
+    if provider == "azure_openai":
+        if _ENV.azure_deployment_name:
+            config["model"] = _ENV.azure_deployment_name
+    
+    elif provider == "aws_bedrock":
+        if _ENV.default_aws_model:
+            config["model"] = _ENV.default_aws_model
+    
+    return MappingProxyType(config)
+
+@lru_cache(maxsize=None)
+def _get_available_providers() -> Tuple[str, ...]:
+    """Lista de proveedores, calculada una sola vez por proceso."""
+    return tuple(LLMConfig.DEFAULT_CONFIGS)
+
+@lru_cache(maxsize=None)
+def _get_llm_credentials(provider: str) -> Mapping[str, Any]:
+    """Credenciales de un proveedor, calculadas una sola vez por proceso."""
+    return MappingProxyType(AppConfig._build_llm_credentials(provider))
+
+def reload_env() -> None:
+    """
+    Vuelve a leer las variables de entorno de los proveedores e invalida las cachés.
+    
+    Pensado para tests que modifican os.environ; los atributos de AppConfig
+    se siguen leyendo una sola vez al importar el módulo.
+    """
+    global _ENV
+    _ENV = _EnvSnapshot.from_environ()
+    _get_provider_config.cache_clear()
+    _get_llm_credentials.cache_clear()
+    _build_config_snapshot.cache_clear()
+
+@lru_cache(maxsize=1)
+def _build_config_snapshot() -> Mapping[str, Any]:
+    """Construye una sola vez por proceso la vista completa de la configuración."""
+    return MappingProxyType({
+        "neo4j": MappingProxyType({
             "uri": AppConfig.NEO4J_URI,
             "user": AppConfig.NEO4J_USER,
             "password": AppConfig.NEO4J_PASSWORD
-        },
-        "flask": {
+        }),
+        "flask": MappingProxyType({
             "port": AppConfig.FLASK_PORT,
             "host": AppConfig.FLASK_HOST,
             "debug": AppConfig.FLASK_DEBUG
-        },
-        "llm": {
+        }),
+        "llm": MappingProxyType({
             "default_provider": AppConfig.DEFAULT_LLM_PROVIDER,
             "available_providers": LLMConfig.get_available_providers(),
-            "provider_configs": {
+            "provider_configs": MappingProxyType({
                 provider: LLMConfig.get_provider_config(provider)
                 for provider in LLMConfig.get_available_providers()
-            }
-        },
-        "aws": {
+            })
+        }),
+        "aws": MappingProxyType({
             "profile": AppConfig.AWS_PROFILE,
             "region": AppConfig.AWS_REGION,
             "default_model": AppConfig.DEFAULT_AWS_MODEL
-        },
-        "azure": {
+        }),
+        "azure": MappingProxyType({
             "deployment_name": AppConfig.AZURE_DEPLOYMENT_NAME
-        }
-    } 
\ No newline at end of file
+        })
+    })
+
+# Configuración global
+def get_config() -> Mapping[str, Any]:
+    """
+    Obtiene toda la configuración de la aplicación.
+    
+    El resultado se construye una vez y es de solo lectura; quien necesite
+    modificarlo debe copiarlo antes (por ejemplo, dict(get_config())).
+    """
+    return _build_config_snapshot()
@@ -1,15 +1,103 @@
-from typing import Dict, List, Any
-from datetime import datetime
-import json
-import re
+from typing import Dict, List, Any, Final, Tuple
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, repeat
 import logging
+import time
 from config import AppConfig
-from llm_providers import LLMProviderFactory
+from llm_providers import ENTITY_TYPES, LLMProviderFactory, PDFContent, dumps_json_pretty, format_entity_block, is_document_analysis
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Keys every relationship returned by the LLM must have
+_REQUIRED_REL_KEYS: Final[frozenset] = frozenset({"subject", "action", "object"})
+# Keys the subject and object of a relationship must have
+_REQUIRED_ENDPOINT_KEYS: Final[frozenset] = frozenset({"type", "name"})
+
+def _analysis_timestamp() -> str:
+    """Analysis timestamp, second precision, in the same format the providers use."""
+    return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+def _new_doc_analysis(metadata: Dict, entities: Dict, relationships: List[Dict]) -> Dict:
+    """Build the documentAnalysis envelope shared by results and error responses."""
+    return {
+        "documentAnalysis": {
+            "metadata": metadata,
+            "entities": entities,
+            "relationships": relationships
+        }
+    }
+
+# Upper bound on concurrent entity extraction calls for a chunked text
+_MAX_CHUNK_WORKERS: Final[int] = 5
+
+def _split_text(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into chunks of at most max_chars characters.
+    
+    Cuts prefer paragraph breaks, then line breaks, then spaces, so entities are
+    rarely split across chunks; a text that already fits is returned as is.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + max_chars
+        if end < len(text):
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, start, end)
+                if cut > start:
+                    end = cut + len(separator)
+                    break
+        chunk = text[start:end]
+        if chunk.strip():
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+def _merge_entity_results(chunk_results: List[Any]) -> Any:
+    """
+    Union the entity extraction results of several chunks.
+    
+    Entities are deduplicated by (type, name), keeping the first occurrence and
+    adding any new aliases. Failed chunks are skipped; if every chunk failed the
+    first result is returned so its error is reported.
+    """
+    valid_results = [
+        result for result in chunk_results
+        if is_document_analysis(result) and 'error' not in result['documentAnalysis'].get('metadata', {})
+    ]
+    if not valid_results:
+        return chunk_results[0]
+    
+    merged: Dict[str, List] = {}
+    seen: Dict[Tuple[str, str], Dict] = {}
+    for result in valid_results:
+        for entity_type, items in result['documentAnalysis']['entities'].items():
+            bucket = merged.setdefault(entity_type, [])
+            for item in items:
+                name = item.get("name") if isinstance(item, dict) else item
+                existing = seen.get((entity_type, name))
+                if existing is None:
+                    seen[(entity_type, name)] = item
+                    bucket.append(item)
+                elif isinstance(existing, dict) and isinstance(item, dict):
+                    aliases = existing.setdefault("aliases", [])
+                    aliases.extend(alias for alias in item.get("aliases", []) if alias not in aliases)
+    
+    return {"documentAnalysis": {"entities": merged}}
+
+def _ensure_config_validated():
+    """Validate the configuration only the first time an extractor is created."""
+    if AppConfig.is_validated():
+        return
+    if not AppConfig.validate_config():
+        raise ValueError("Configuración inválida. Revisa los errores anteriores.")
+
 class EnhancedEntityRelationshipExtractor:
     """Extracts named entities and relationships from text using multiple LLM providers."""
     
@@ -22,13 +110,12 @@ class EnhancedEntityRelationshipExtractor:
                 If None, uses the default provider from configuration.
             debug_mode (bool): Enable debug mode to show LLM prompts and responses
         """
-        # Validar configuración antes de inicializar
-        if not AppConfig.validate_config():
-            raise ValueError("Configuración inválida. Revisa los errores anteriores.")
+        # Validar configuración antes de inicializar (solo la primera vez)
+        _ensure_config_validated()
         
         self.provider_name = provider_name or AppConfig.DEFAULT_LLM_PROVIDER
         self.debug_mode = debug_mode
-        logger.info(f"Inicializando extractor con proveedor: {self.provider_name}")
+        logger.info("Inicializando extractor con proveedor: %s", self.provider_name)
         if debug_mode:
             logger.info("Modo debug habilitado - se mostrarán prompts y respuestas del LLM")
         
@@ -37,9 +124,9 @@ class EnhancedEntityRelationshipExtractor:
             # Pasar el modo debug al proveedor
             if hasattr(self.llm_provider, 'set_debug_mode'):
                 self.llm_provider.set_debug_mode(debug_mode)
-            logger.info(f"Proveedor {self.provider_name} inicializado correctamente")
+            logger.info("Proveedor %s inicializado correctamente", self.provider_name)
         except Exception as e:
-            logger.error(f"Error al inicializar proveedor {self.provider_name}: {str(e)}")
+            logger.error("Error al inicializar proveedor %s: %s", self.provider_name, e)
             raise
 
     def analyze_text(self, text: str, doc_title: str = "Untitled Document", language: str = "en") -> Dict:
@@ -54,94 +141,265 @@ class EnhancedEntityRelationshipExtractor:
         Returns:
             Dict: Analysis results with entities and relationships
         """
+        # Una sola marca de tiempo por análisis, compartida por el resultado y los errores
+        analysis_date = _analysis_timestamp()
         try:
-            logger.info(f"Analizando texto con proveedor: {self.provider_name}")
+            logger.info("Analizando texto con proveedor: %s", self.provider_name)
             
             # Extract entities
             logger.info("Extrayendo entidades...")
-            entities_result = self.llm_provider.extract_entities(text)
+            entities_result = self._extract_entities(text)
+            entities, error_response = self._entities_or_error(entities_result, analysis_date)
+            if error_response is not None:
+                return error_response
             
-            if not entities_result or 'documentAnalysis' not in entities_result:
-                logger.error("No se pudieron extraer entidades del texto")
-                return self._create_error_response("Error en la extracción de entidades")
+            # Explicit and inferred relationships only depend on the entities,
+            # so both LLM calls run concurrently
+            logger.info("Extrayendo relaciones explícitas e infiriendo relaciones adicionales...")
+            # Both prompts list the same entities: format them once
+            entity_text = format_entity_block(entities)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                explicit_future = executor.submit(self.llm_provider.extract_relationships, text, entities, entity_text)
+                inferred_future = executor.submit(self.llm_provider.infer_additional_relationships, entities, entity_text)
+                explicit_relationships = explicit_future.result()
+                inferred_relationships = inferred_future.result()
             
-            # Verificar si hay error en los metadatos
-            metadata = entities_result['documentAnalysis'].get('metadata', {})
-            if 'error' in metadata:
-                logger.error(f"Error en extracción de entidades: {metadata['error']}")
-                return entities_result  # Retornar el error tal como viene
-            
-            entities = entities_result['documentAnalysis']['entities']
-            logger.info(f"Entidades extraídas: {sum(len(ents) for ents in entities.values())}")
-            
-            # Extract explicit relationships
-            logger.info("Extrayendo relaciones explícitas...")
-            explicit_relationships = self.llm_provider.extract_relationships(text, entities)
-            if not isinstance(explicit_relationships, list):
-                explicit_relationships = []
-            logger.info(f"Relaciones explícitas encontradas: {len(explicit_relationships)}")
-            
-            # Infer additional relationships
-            logger.info("Inferiendo relaciones adicionales...")
-            inferred_relationships = self.llm_provider.infer_additional_relationships(entities)
-            if not isinstance(inferred_relationships, list):
-                inferred_relationships = []
-            logger.info(f"Relaciones inferidas: {len(inferred_relationships)}")
-            
-            # Merge relationships
-            all_relationships = self._merge_relationships(explicit_relationships, inferred_relationships)
-            logger.info(f"Total de relaciones: {len(all_relationships)}")
-            
-            # Create final result
-            result = {
-                "documentAnalysis": {
-                    "metadata": {
-                        "title": doc_title,
-                        "analysisDate": datetime.now().isoformat(),
-                        "language": language,
-                        "provider": self.provider_name
-                    },
-                    "entities": entities,
-                    "relationships": all_relationships
-                }
-            }
-            
-            logger.info("Análisis completado exitosamente")
-            return result
+            return self._build_text_result(
+                entities, explicit_relationships, inferred_relationships, doc_title, language, analysis_date
+            )
             
         except Exception as e:
-            logger.error(f"Error durante el análisis: {str(e)}")
-            return self._create_error_response(f"Error en el análisis: {str(e)}")
+            logger.error("Error durante el análisis: %s", e)
+            return self._create_error_response(f"Error en el análisis: {str(e)}", analysis_date)
+    
+    async def analyze_text_async(self, text: str, doc_title: str = "Untitled Document", language: str = "en") -> Dict:
+        """
+        Asynchronous version of analyze_text for callers that already run an event loop.
+        
+        Args:
+            text (str): Text to analyze
+            doc_title (str): Title of the document
+            language (str): Language of the text
+            
+        Returns:
+            Dict: Analysis results with entities and relationships
+        """
+        analysis_date = _analysis_timestamp()
+        try:
+            logger.info("Analizando texto (async) con proveedor: %s", self.provider_name)
+            
+            logger.info("Extrayendo entidades...")
+            entities_result = await self._extract_entities_async(text)
+            entities, error_response = self._entities_or_error(entities_result, analysis_date)
+            if error_response is not None:
+                return error_response
+            
+            logger.info("Extrayendo relaciones explícitas e infiriendo relaciones adicionales...")
+            entity_text = format_entity_block(entities)
+            explicit_relationships, inferred_relationships = await asyncio.gather(
+                self.llm_provider.extract_relationships_async(text, entities, entity_text),
+                self.llm_provider.infer_additional_relationships_async(entities, entity_text)
+            )
+            
+            return self._build_text_result(
+                entities, explicit_relationships, inferred_relationships, doc_title, language, analysis_date
+            )
+            
+        except Exception as e:
+            logger.error("Error durante el análisis: %s", e)
+            return self._create_error_response(f"Error en el análisis: {str(e)}", analysis_date)
+    
+    def analyze_texts_batch(self, documents: List[Tuple[str, str, str]]) -> List[Dict]:
+        """
+        Analyze many texts through the provider's batch API.
+        
+        Entity prompts for all documents go in one batch; relationship and inference
+        prompts for the documents whose entities were extracted go in a second one.
+        Providers without a batch endpoint, or a failing batch, fall back to
+        analyze_text per document.
+        
+        Args:
+            documents (List[Tuple[str, str, str]]): (text, doc_title, language) per document
+            
+        Returns:
+            List[Dict]: Analysis results in the same order as the input documents
+        """
+        if not getattr(self.llm_provider, "supports_batch", False):
+            logger.info("El proveedor %s no soporta lotes; analizando documento por documento", self.provider_name)
+            return [self.analyze_text(text, doc_title, language) for text, doc_title, language in documents]
+        
+        analysis_date = _analysis_timestamp()
+        try:
+            logger.info("Extrayendo entidades de %d documentos en lote...", len(documents))
+            entity_results = self.llm_provider.extract_entities_batch([text for text, _, _ in documents])
+            
+            results: List[Dict] = [None] * len(documents)
+            pending = []
+            for index, ((text, _, _), entities_result) in enumerate(zip(documents, entity_results)):
+                entities, error_response = self._entities_or_error(entities_result, analysis_date)
+                if error_response is not None:
+                    results[index] = error_response
+                else:
+                    pending.append((index, text, entities))
+            
+            if pending:
+                logger.info("Extrayendo e infiriendo relaciones de %d documentos en lote...", len(pending))
+                relationship_results = self.llm_provider.extract_relationships_batch(
+                    [(text, entities) for _, text, entities in pending]
+                )
+                for (index, _, entities), (explicit, inferred) in zip(pending, relationship_results):
+                    _, doc_title, language = documents[index]
+                    results[index] = self._build_text_result(
+                        entities, explicit, inferred, doc_title, language, analysis_date
+                    )
+            return results
+            
+        except Exception as e:
+            logger.error("Error en el análisis por lotes, analizando documento por documento: %s", e)
+            return [self.analyze_text(text, doc_title, language) for text, doc_title, language in documents]
+    
+    def _chunk_text(self, text: str) -> List[str]:
+        """Split text by the provider's max_chunk_chars setting."""
+        return _split_text(text, self.llm_provider.config.get("max_chunk_chars", 24000))
+    
+    def _extract_entities(self, text: str) -> Any:
+        """
+        Extract entities, fanning long texts out over concurrent chunk calls.
+        
+        Args:
+            text (str): Text to analyze
+            
+        Returns:
+            Any: Entity extraction result (merged across chunks for long texts)
+        """
+        chunks = self._chunk_text(text)
+        if len(chunks) == 1:
+            return self.llm_provider.extract_entities(text)
+        
+        logger.info("Texto dividido en %d fragmentos para extraer entidades", len(chunks))
+        with ThreadPoolExecutor(max_workers=min(len(chunks), _MAX_CHUNK_WORKERS)) as executor:
+            chunk_results = list(executor.map(self.llm_provider.extract_entities, chunks))
+        return _merge_entity_results(chunk_results)
+    
+    async def _extract_entities_async(self, text: str) -> Any:
+        """
+        Asynchronous version of _extract_entities.
+        
+        Args:
+            text (str): Text to analyze
+            
+        Returns:
+            Any: Entity extraction result (merged across chunks for long texts)
+        """
+        chunks = self._chunk_text(text)
+        if len(chunks) == 1:
+            return await self.llm_provider.extract_entities_async(text)
+        
+        logger.info("Texto dividido en %d fragmentos para extraer entidades", len(chunks))
+        semaphore = asyncio.Semaphore(_MAX_CHUNK_WORKERS)
+        
+        async def extract(chunk: str) -> Any:
+            async with semaphore:
+                return await self.llm_provider.extract_entities_async(chunk)
+        
+        chunk_results = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+        return _merge_entity_results(chunk_results)
     
-    def analyze_pdf(self, pdf_content: bytes, doc_title: str = "Untitled Document", language: str = "en") -> Dict:
+    def _entities_or_error(self, entities_result: Any, analysis_date: str) -> Tuple[Dict, Dict]:
+        """
+        Split an entity extraction result into its entities or an error response.
+        
+        Args:
+            entities_result (Any): Parsed response of the entity extraction prompt
+            analysis_date (str): Timestamp of the current analysis
+            
+        Returns:
+            Tuple[Dict, Dict]: (entities, None) on success, (None, error_response) otherwise
+        """
+        if not is_document_analysis(entities_result):
+            logger.error("No se pudieron extraer entidades del texto")
+            return None, self._create_error_response("Error en la extracción de entidades", analysis_date)
+        
+        # Verificar si hay error en los metadatos
+        metadata = entities_result['documentAnalysis'].get('metadata', {})
+        if 'error' in metadata:
+            logger.error("Error en extracción de entidades: %s", metadata['error'])
+            return None, entities_result  # Retornar el error tal como viene
+        
+        entities = entities_result['documentAnalysis']['entities']
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Entidades extraídas: %d", sum(map(len, entities.values())))
+        return entities, None
+    
+    def _build_text_result(self, entities: Dict, explicit_relationships: List[Dict], inferred_relationships: List[Dict],
+                           doc_title: str, language: str, analysis_date: str) -> Dict:
+        """
+        Merge the relationship results and assemble the final text analysis.
+        
+        Args:
+            entities (Dict): Extracted entities grouped by type
+            explicit_relationships (List[Dict]): Relationships explicitly found in text
+            inferred_relationships (List[Dict]): Relationships inferred from entities
+            doc_title (str): Title of the document
+            language (str): Language of the text
+            analysis_date (str): Timestamp of the current analysis
+            
+        Returns:
+            Dict: Analysis results with entities and relationships
+        """
+        logger.info("Relaciones explícitas encontradas: %d", len(explicit_relationships))
+        logger.info("Relaciones inferidas: %d", len(inferred_relationships))
+        
+        # Merge relationships
+        all_relationships = self._merge_relationships(explicit_relationships, inferred_relationships)
+        logger.info("Total de relaciones: %d", len(all_relationships))
+        
+        # Create final result
+        result = _new_doc_analysis(
+            {
+                "title": doc_title,
+                "analysisDate": analysis_date,
+                "language": language,
+                "provider": self.provider_name
+            },
+            entities,
+            all_relationships
+        )
+        
+        logger.info("Análisis completado exitosamente")
+        return result
+    
+    def analyze_pdf(self, pdf_content: PDFContent, doc_title: str = "Untitled Document", language: str = "en") -> Dict:
         """
         Analyze a PDF document to extract entities and relationships.
         
         Args:
-            pdf_content (bytes): The content of the PDF file
+            pdf_content (bytes | bytearray | memoryview): The content of the PDF file
             doc_title (str): Title of the document
             language (str): Language of the document
             
         Returns:
             Dict: Analysis results with entities and relationships
         """
+        analysis_date = _analysis_timestamp()
         try:
-            logger.info(f"Analizando PDF con proveedor: {self.provider_name}")
+            logger.info("Analizando PDF con proveedor: %s", self.provider_name)
             
             # Usar el método analyze_pdf del proveedor que ya maneja PDFs grandes
             result = self.llm_provider.analyze_pdf(pdf_content)
             
-            if self.debug_mode:
-                logger.info(f"[DEBUG] Resultado completo del análisis de PDF: {json.dumps(result, indent=2, ensure_ascii=False)}")
+            # Serializar el resultado completo solo si el registro se va a emitir
+            if self.debug_mode and logger.isEnabledFor(logging.INFO):
+                logger.info("[DEBUG] Resultado completo del análisis de PDF: %s", dumps_json_pretty(result))
             
-            if not result or 'documentAnalysis' not in result:
+            if not is_document_analysis(result):
                 logger.error("No se pudieron obtener resultados del análisis del PDF")
-                return self._create_error_response("Error en el análisis del PDF")
+                return self._create_error_response("Error en el análisis del PDF", analysis_date)
             
             # Verificar si hay error en los metadatos
             metadata = result['documentAnalysis'].get('metadata', {})
             if 'error' in metadata:
-                logger.error(f"Error en análisis de PDF: {metadata['error']}")
+                logger.error("Error en análisis de PDF: %s", metadata['error'])
                 return result  # Retornar el error tal como viene
             
             # Asegurar que metadata existe
@@ -156,15 +414,16 @@ class EnhancedEntityRelationshipExtractor:
             entities = result['documentAnalysis']['entities']
             relationships = result['documentAnalysis'].get('relationships', [])
             
-            logger.info(f"Entidades extraídas del PDF: {sum(len(ents) for ents in entities.values())}")
-            logger.info(f"Relaciones encontradas en PDF: {len(relationships)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Entidades extraídas del PDF: %d", sum(map(len, entities.values())))
+            logger.info("Relaciones encontradas en PDF: %d", len(relationships))
             
             logger.info("Análisis de PDF completado exitosamente")
             return result
             
         except Exception as e:
-            logger.error(f"Error durante el análisis del PDF: {str(e)}", exc_info=True)
-            return self._create_error_response(f"Error en el análisis del PDF: {str(e)}")
+            logger.error("Error durante el análisis del PDF: %s", e, exc_info=True)
+            return self._create_error_response(f"Error en el análisis del PDF: {str(e)}", analysis_date)
 
     def _merge_relationships(self, explicit_relationships: List[Dict], inferred_relationships: List[Dict]) -> List[Dict]:
         """
@@ -177,68 +436,58 @@ class EnhancedEntityRelationshipExtractor:
         Returns:
             List[Dict]: Merged and deduplicated relationships
         """
-        all_relationships = []
-        seen_relationships = set()
-        
-        # Add explicit relationships first
-        for rel in explicit_relationships:
-            if self._is_valid_relationship(rel):
-                rel_key = self._create_relationship_key(rel)
-                if rel_key not in seen_relationships:
-                    rel["source"] = "explicit"
-                    all_relationships.append(rel)
-                    seen_relationships.add(rel_key)
-        
-        # Add inferred relationships (avoiding duplicates)
-        for rel in inferred_relationships:
-            if self._is_valid_relationship(rel):
-                rel_key = self._create_relationship_key(rel)
-                if rel_key not in seen_relationships:
-                    rel["source"] = "inferred"
-                    all_relationships.append(rel)
-                    seen_relationships.add(rel_key)
-        
-        return all_relationships
+        # Insertion-ordered dict: first relationship seen for each key wins
+        by_key: Dict[Tuple, Dict] = {}
+        is_valid = self._is_valid_relationship
+        
+        # Explicit relationships go first so they win over inferred duplicates
+        tagged_relationships = chain(
+            zip(explicit_relationships, repeat("explicit")),
+            zip(inferred_relationships, repeat("inferred"))
+        )
+        for rel, source in tagged_relationships:
+            if not is_valid(rel):
+                continue
+            # Duplicate key: (subject type, subject name, action, object type, object name)
+            subject = rel["subject"]
+            object_ = rel["object"]
+            rel_key = (subject["type"], subject["name"], rel["action"], object_["type"], object_["name"])
+            if by_key.setdefault(rel_key, rel) is rel:
+                rel["source"] = source
+        
+        return list(by_key.values())
 
     def _is_valid_relationship(self, relationship: Dict) -> bool:
-        """Check if a relationship has the required structure."""
-        required_keys = ["subject", "action", "object"]
-        return all(key in relationship for key in required_keys)
+        """Check if a relationship has the required structure, including subject/object type and name."""
+        if not (isinstance(relationship, dict) and _REQUIRED_REL_KEYS <= relationship.keys()):
+            return False
+        subject = relationship["subject"]
+        object_ = relationship["object"]
+        return (
+            isinstance(subject, dict) and _REQUIRED_ENDPOINT_KEYS <= subject.keys()
+            and isinstance(object_, dict) and _REQUIRED_ENDPOINT_KEYS <= object_.keys()
+        )
 
-    def _create_relationship_key(self, relationship: Dict) -> str:
-        """Create a unique key for a relationship to detect duplicates."""
-        subject = relationship.get("subject", {})
-        object_ = relationship.get("object", {})
-        action = relationship.get("action", "")
-        
-        subject_key = f"{subject.get('type', '')}:{subject.get('name', '')}"
-        object_key = f"{object_.get('type', '')}:{object_.get('name', '')}"
+    def _create_error_response(self, error_message: str, analysis_date: str = None) -> Dict:
+        """
+        Create an error response with the specified message.
         
-        return f"{subject_key}|{action}|{object_key}"
-    
-    def _create_error_response(self, error_message: str) -> Dict:
-        """Create an error response with the specified message."""
-        return {
-            "documentAnalysis": {
-                "metadata": {
-                    "title": "Error",
-                    "analysisDate": datetime.now().isoformat(),
-                    "language": "en",
-                    "provider": self.provider_name,
-                    "error": error_message
-                },
-                "entities": {
-                    "Person": [],
-                    "Organization": [],
-                    "Location": [],
-                    "Date": [],
-                    "Event": [],
-                    "Object": [],
-                    "Code": []
-                },
-                "relationships": []
-            }
-        }
+        Args:
+            error_message (str): Error description stored in the metadata
+            analysis_date (str, optional): Timestamp already computed for the current
+                analysis; a new one is generated if omitted
+        """
+        return _new_doc_analysis(
+            {
+                "title": "Error",
+                "analysisDate": analysis_date or _analysis_timestamp(),
+                "language": "en",
+                "provider": self.provider_name,
+                "error": error_message
+            },
+            {entity_type: [] for entity_type in ENTITY_TYPES},
+            []
+        )
 
     def get_provider_info(self) -> Dict[str, Any]:
         """Get information about the current LLM provider."""
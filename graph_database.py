@@ -1,8 +1,13 @@
-from neo4j import GraphDatabase
-from typing import Dict, List, Any
+from neo4j import READ_ACCESS, AsyncGraphDatabase, GraphDatabase
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import ClassVar, Dict, List, Any, Optional, Tuple
+import asyncio
 import logging
 import os
-from dotenv import load_dotenv
+import threading
+import time
+import unicodedata
 import uuid
 from config import AppConfig
 
@@ -10,39 +15,598 @@ from config import AppConfig
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Write queries shared by EntityGraph and AsyncEntityGraph
+# Documents with a source URL are keyed by it, so re-analyzing a URL updates its node;
+# any other analysis gets a key of its own (see _document_key)
+_MERGE_DOCUMENT_QUERY = """
+MERGE (d:Document {key: $key})
+ON CREATE SET d.uuid = $uuid,
+    d.title = $title,
+    d.source_url = $source_url
+SET d.analysisDate = $analysisDate,
+    d.language = $language,
+    d.provider = $provider
+RETURN d.uuid AS document_uuid
+"""
+
+# Same as _MERGE_DOCUMENT_QUERY for a list of documents
+_MERGE_DOCUMENTS_QUERY = """
+UNWIND $documents AS doc
+MERGE (d:Document {key: doc.key})
+ON CREATE SET d.uuid = doc.uuid,
+    d.title = doc.title,
+    d.source_url = doc.source_url
+SET d.analysisDate = doc.analysisDate,
+    d.language = doc.language,
+    d.provider = doc.provider
+RETURN doc.key AS key, d.uuid AS document_uuid
+"""
+
+# Entities stored before UUIDs were assigned get one on their next MERGE
+# Each entity is also linked to the document it was extracted from, in the same statement.
+# Rows of entities only referenced by a relationship carry null spanish/aliases, so
+# they keep the values already stored (see _entity_rows)
+_MERGE_ENTITIES_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Document {uuid: row.document_uuid})
+MERGE (e:Entity {name: row.name, type: row.type})
+ON CREATE SET e.uuid = row.uuid
+ON MATCH SET e.uuid = coalesce(e.uuid, row.uuid)
+SET e.spanish = coalesce(row.spanish, e.spanish, ''),
+    e.aliases = coalesce(row.aliases, e.aliases, [])
+MERGE (e)-[:MENTIONED_IN]->(d)
+RETURN row.type AS type, row.name AS name, e.uuid AS entity_uuid
+"""
+
+# Relationship types cannot be parameterized, so there is one query per type.
+# A missing category keeps the one already stored on the relationship.
+_MERGE_RELATIONSHIPS_QUERIES = {
+    rel_type: f"""
+UNWIND $rows AS row
+MATCH (s:Entity {{uuid: row.subject_uuid}})
+MATCH (o:Entity {{uuid: row.object_uuid}})
+MERGE (s)-[r:{rel_type}]->(o)
+SET r.action = row.action,
+    r.source = row.source,
+    r.category = coalesce(row.category, r.category)
+"""
+    for rel_type in ("RELATES_TO", "INFERRED")
+}
+
+# Read queries of EntityGraph
+# Tail shared by the graph and subgraph queries: given a list of distinct entity nodes,
+# returns them and the RELATES_TO links among them, built with map projections. Each
+# relationship is matched once, from its start node, so no DISTINCT is needed.
+# 'source'/'target' carry only the IDs for D3; 'source_type' is the relationship origin
+# (explicit/inferred), as the frontend expects
+_GRAPH_OF_ENTITIES = """
+CALL {
+    WITH entities
+    UNWIND entities AS s
+    MATCH (s)-[r:RELATES_TO]->(t:Entity)
+    WHERE t IN entities
+    RETURN collect({
+        source: s.uuid,
+        target: t.uuid,
+        source_name: s.name,
+        source_type: coalesce(r.source, 'explicit'),
+        target_name: t.name,
+        action: r.action,
+        category: coalesce(r.category, 'unknown'),
+        id: elementId(r)
+    }) AS links
+}
+RETURN [e IN entities | e {
+    id: e.uuid, .name, .type,
+    spanish: CASE WHEN e.spanish <> '' THEN e.spanish END
+}] AS nodes, links
+"""
+
+# A page of entities and their links, paged by key: the entities with a uuid after
+# $after, in uuid order. The range seek and the order come from the entity_uuid
+# constraint's index, so no page sorts the label or walks the pages before it
+_ENTITY_GRAPH_QUERY = """
+MATCH (e:Entity)
+WHERE e.uuid > $after
+WITH e ORDER BY e.uuid LIMIT $limit
+WITH collect(e) AS entities
+""" + _GRAPH_OF_ENTITIES
+
+_ENTITY_NAMES_QUERY = """
+MATCH (e:Entity)
+RETURN DISTINCT e.name AS name
+ORDER BY e.name
+"""
+
+# Entities within depth hops of a start entity (found by uuid or by name) and their
+# links. Variable-length bounds cannot be parameters: one query text per depth
+_SUBGRAPH_START = {
+    'uuid': "MATCH (start:Entity {uuid: $entity_id})",
+    'name': "MATCH (start:Entity {name: $entity_name})\nWITH start LIMIT 1",
+}
+
+_SUBGRAPH_QUERY_TEMPLATE = """
+{start}
+MATCH (start)-[:RELATES_TO*0..{depth}]-(e:Entity)
+WITH collect(DISTINCT e) AS entities
+"""
+
+def _build_subgraph_query(start: str, depth: int) -> str:
+    """Full subgraph query text for a start variant and depth."""
+    return _SUBGRAPH_QUERY_TEMPLATE.format(start=_SUBGRAPH_START[start], depth=int(depth)) + _GRAPH_OF_ENTITIES
+
+_SUBGRAPH_QUERIES = {
+    (start, depth): _build_subgraph_query(start, depth) for start in _SUBGRAPH_START for depth in range(1, 7)
+}
+
+def _subgraph_query(start: str, depth: int) -> str:
+    """Subgraph query starting by 'uuid' or 'name'; prebuilt for the usual depths 1-6."""
+    query = _SUBGRAPH_QUERIES.get((start, depth))
+    if query is None:
+        query = _build_subgraph_query(start, depth)
+    return query
+
+# shortestPath runs a bidirectional BFS per (from, to) pair; the ORDER BY only
+# picks the shortest among pairs when several entities share a name
+_SHORTEST_PATH_QUERY = """
+MATCH (from:Entity {name: $from_name})
+MATCH (to:Entity {name: $to_name})
+WHERE from <> to
+MATCH path = shortestPath((from)-[:RELATES_TO*1..6]-(to))
+WITH path
+ORDER BY length(path) ASC
+LIMIT 1
+RETURN path, 
+       [rel in relationships(path) | elementId(rel)] AS relationship_ids,
+       [rel in relationships(path) | {
+           id: elementId(rel),
+           source: startNode(rel).name,
+           target: endNode(rel).name,
+           action: rel.action,
+           category: rel.category
+       }] AS relationships
+"""
+
+# Reset query: DETACH DELETE drops each node with its relationships, 10000 nodes per
+# inner transaction. CALL ... IN TRANSACTIONS needs an auto-commit session.run
+_DELETE_ALL_QUERY = "MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS"
+
+# Constraints and indexes backing the MERGE/MATCH lookups
+_SCHEMA_QUERIES = (
+    "CREATE CONSTRAINT entity_uuid IF NOT EXISTS FOR (e:Entity) REQUIRE e.uuid IS UNIQUE",
+    "CREATE CONSTRAINT doc_uuid IF NOT EXISTS FOR (d:Document) REQUIRE d.uuid IS UNIQUE",
+    "CREATE CONSTRAINT doc_key IF NOT EXISTS FOR (d:Document) REQUIRE d.key IS UNIQUE",
+    # Name-only lookups (subgraph by name, shortest path, query_graph)
+    "CREATE INDEX entity_name IF NOT EXISTS FOR (e:Entity) ON (e.name)",
+)
+
+# (name, type) is the MERGE key of entities: a uniqueness constraint also stops
+# concurrent writers from creating duplicates. Earlier versions created a plain index
+# on the same properties, which has to be dropped before the constraint can exist;
+# while stored duplicates block the constraint, the index is kept instead
+_ENTITY_NAME_TYPE_CONSTRAINT_EXISTS_QUERY = (
+    "SHOW CONSTRAINTS YIELD name WHERE name = 'entity_name_type_unique' RETURN count(*) AS count"
+)
+_DUPLICATE_ENTITIES_QUERY = """
+MATCH (e:Entity)
+WITH e.name AS name, e.type AS type, count(*) AS copies
+WHERE copies > 1
+RETURN count(*) AS count
+"""
+_DROP_ENTITY_NAME_TYPE_INDEX_QUERY = "DROP INDEX entity_name_type IF EXISTS"
+_ENTITY_NAME_TYPE_CONSTRAINT_QUERY = (
+    "CREATE CONSTRAINT entity_name_type_unique IF NOT EXISTS FOR (e:Entity) REQUIRE (e.name, e.type) IS UNIQUE"
+)
+_ENTITY_NAME_TYPE_INDEX_QUERY = "CREATE INDEX entity_name_type IF NOT EXISTS FOR (e:Entity) ON (e.name, e.type)"
+
+# Documents stored before Document.key existed get their source URL as key, so that
+# re-analysing the URL updates them instead of creating a duplicate. Older databases
+# may hold several nodes for one URL: only the most recent one gets the key (the
+# doc_key constraint allows one), the rest stay unkeyed and are reported
+_BACKFILL_DOCUMENT_KEYS_QUERY = """
+MATCH (d:Document)
+WHERE d.key IS NULL AND d.source_url IS NOT NULL
+WITH d ORDER BY coalesce(d.analysisDate, '') DESC
+WITH d.source_url AS url, collect(d) AS docs
+WITH url, docs, EXISTS { MATCH (:Document {key: url}) } AS taken
+FOREACH (d IN CASE WHEN taken THEN [] ELSE docs[0..1] END | SET d.key = url)
+WITH CASE WHEN taken THEN 0 ELSE 1 END AS keyed, size(docs) AS found
+RETURN coalesce(sum(keyed), 0) AS backfilled, coalesce(sum(found - keyed), 0) AS unkeyed
+"""
+
+def _log_document_key_backfill(record) -> None:
+    """Report the result of _BACKFILL_DOCUMENT_KEYS_QUERY."""
+    if record['backfilled']:
+        logger.info("Set the key of %s existing Document nodes from their source URL", record['backfilled'])
+    if record['unkeyed']:
+        logger.warning("%s duplicate Document nodes share a source URL with a keyed one and were left "
+                       "without key; merge or delete them to remove the duplicates", record['unkeyed'])
+
+_AWAIT_INDEXES_QUERY = "CALL db.awaitIndexes(300)"
+
+# Rows sent per UNWIND statement; larger lists are split into several statements
+_WRITE_BATCH_SIZE = 1000
+
+def _batches(rows: List[Any], size: int = _WRITE_BATCH_SIZE):
+    """Yield consecutive slices of at most size rows."""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def _driver_options() -> Dict[str, Any]:
+    """Connection pool and retry settings shared by the sync and async drivers."""
+    return {
+        'max_connection_pool_size': AppConfig.NEO4J_POOL,
+        'max_connection_lifetime': AppConfig.NEO4J_MAX_CONNECTION_LIFETIME,
+        'connection_acquisition_timeout': AppConfig.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        'connection_timeout': AppConfig.NEO4J_CONNECTION_TIMEOUT,
+        'max_transaction_retry_time': AppConfig.NEO4J_MAX_TRANSACTION_RETRY_TIME,
+        'keep_alive': True
+    }
+
+def _document_key(metadata: Dict, source_url: str = None) -> str:
+    """
+    Key of a document node: its source URL, or a unique key per analysis.
+    
+    Titles do not identify a document (files share stems, failed analyses are all
+    titled "Error"), so documents without a URL are never merged; neither are
+    failed analyses, which must not update the node of a successful one.
+    """
+    if source_url and 'error' not in metadata:
+        return source_url
+    return f"uuid:{uuid.uuid4().hex}"
+
+def _document_params(metadata: Dict, source_url: str = None) -> Dict[str, Any]:
+    """Parameters of one document for _MERGE_DOCUMENT_QUERY/_MERGE_DOCUMENTS_QUERY, with a UUID for a new document."""
+    return {
+        'key': _document_key(metadata, source_url),
+        'uuid': uuid.uuid4().hex,
+        'title': metadata.get('title', 'Untitled'),
+        'analysisDate': metadata.get('analysisDate', ''),
+        'language': metadata.get('language', 'en'),
+        'source_url': source_url,
+        'provider': metadata.get('provider', 'unknown')
+    }
+
+def _entity_objects(entities: List[Any]) -> List[Dict]:
+    """Handle both string and dictionary entity formats."""
+    return [{"name": entity} if isinstance(entity, str) else entity for entity in entities]
+
+def _entity_rows(entities: List[Dict], entity_type: str, document_uuid: str) -> List[Dict]:
+    """Rows for _MERGE_ENTITIES_QUERY, each with a UUID for newly created entities."""
+    rows = []
+    for entity in entities:
+        if entity.get('referenced_only'):
+            # Only named by a relationship: nothing known about it, keep what is stored
+            rows.append({
+                'name': entity['name'],
+                'type': entity_type,
+                'document_uuid': document_uuid,
+                'uuid': uuid.uuid4().hex,
+                'spanish': None,
+                'aliases': None
+            })
+            continue
+        # Prepare aliases as a string list for Neo4j
+        aliases = entity.get('aliases', [])
+        if not isinstance(aliases, list):
+            aliases = []
+        rows.append({
+            'name': entity['name'],
+            'type': entity_type,
+            'document_uuid': document_uuid,
+            # Generate a UUID for new entities
+            'uuid': uuid.uuid4().hex,
+            # Safely get spanish field
+            'spanish': entity.get('spanish', ''),
+            'aliases': aliases
+        })
+    return rows
+
+class _EntityNamesCache:
+    """
+    Entity names for autocomplete, kept for ttl seconds and dropped on every write.
+    
+    Module-level so that every EntityGraph in the process shares it (the web app
+    creates one per request); writes from other processes show up after the TTL.
+    """
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._names = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """Cached names as a tuple, or None if missing or expired."""
+        with self._lock:
+            if self._names is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._names
+            return None
+    
+    def set(self, names: Tuple[str, ...]):
+        """Store freshly read names."""
+        with self._lock:
+            self._names = names
+            self._loaded_at = time.monotonic()
+    
+    def invalidate(self):
+        """Forget the names (after a write or a reset)."""
+        with self._lock:
+            self._names = None
+
+_entity_names_cache = _EntityNamesCache(ttl=30)
+
+# Punctuation and spaces removed by _normalize, in one str.translate pass
+_PUNCT_TABLE = str.maketrans('', '', "-_'\".,:;()[]{} ")
+
+@lru_cache(maxsize=4096)
+def _normalize(s: str) -> str:
+    """Normalize a name for comparison: lowercase, no accents, punctuation or spaces."""
+    s = s.lower()
+    # ASCII text has no accents to strip
+    if not s.isascii():
+        s = unicodedata.normalize('NFKD', s)
+        s = ''.join(c for c in s if not unicodedata.combining(c))
+    return s.translate(_PUNCT_TABLE)
+
+def _uuids_by_name(entity_type: str, entity_objs: List[Dict],
+                   entity_uuids: Dict[Tuple[str, str], str]) -> Dict[str, str]:
+    """UUIDs of the given entities of one type, by name."""
+    return {entity_obj['name']: entity_uuids[(entity_type, entity_obj['name'])] for entity_obj in entity_objs}
+
+class _EntityIndex:
+    """UUIDs of the entities stored for one document, looked up by type and name or alias."""
+    
+    def __init__(self):
+        # Keys use the lowercase entity type to match relationship lookup
+        self.entity_uuids = {}
+        self.norm_index = {}   # (type, normalized name) -> uuid
+        self.alias_index = {}  # (type, normalized alias) -> uuid
+    
+    def add(self, entity_type: str, entity_objs: List[Dict], uuids_by_name: Dict[str, str]):
+        """Register the stored entities of one type; uuids_by_name comes from the MERGE records."""
+        entity_type = entity_type.lower()
+        self.entity_uuids.update(((entity_type, name), entity_uuid) for name, entity_uuid in uuids_by_name.items())
+        # The first entity registered under a normalized name or alias wins, as in a sequential scan
+        for entity_obj in entity_objs:
+            entity_uuid = uuids_by_name[entity_obj['name']]
+            self.norm_index.setdefault((entity_type, _normalize(entity_obj['name'])), entity_uuid)
+            aliases = entity_obj.get('aliases', [])
+            if isinstance(aliases, list):
+                for alias in aliases:
+                    self.alias_index.setdefault((entity_type, _normalize(alias)), entity_uuid)
+    
+    def find_uuid(self, entity_type: str, name: str):
+        """UUID of an entity by exact name, then normalized name, then normalized alias."""
+        # Normalizar el tipo de entidad para que coincida con el almacenamiento
+        entity_type_lower = entity_type.lower()
+        entity_uuid = self.entity_uuids.get((entity_type_lower, name))
+        if entity_uuid is None:
+            norm_key = (entity_type_lower, _normalize(name))
+            entity_uuid = self.norm_index.get(norm_key) or self.alias_index.get(norm_key)
+        if entity_uuid is None:
+            logger.warning("[UUID-SEARCH] ✗ No encontrado: '%s' (tipo: '%s')", name, entity_type)
+        return entity_uuid
+
+def _entities_with_missing_endpoints(entities_by_type: Dict[str, List[Any]],
+                                     relationships: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Entity objects by type, plus any relationship subject/object not among them.
+    
+    Endpoints are matched like _EntityIndex.find_uuid does (normalized name or alias),
+    so after storing the result every relationship endpoint resolves to a UUID. Added
+    endpoints are marked 'referenced_only' so their MERGE leaves stored properties alone.
+    """
+    entities = {entity_type: _entity_objects(objs) for entity_type, objs in entities_by_type.items()}
+    type_keys = {entity_type.lower(): entity_type for entity_type in entities}
+    known_names = {}
+    for entity_type, entity_objs in entities.items():
+        names = known_names.setdefault(entity_type.lower(), set())
+        for entity_obj in entity_objs:
+            names.add(_normalize(entity_obj['name']))
+            aliases = entity_obj.get('aliases', [])
+            if isinstance(aliases, list):
+                names.update(_normalize(alias) for alias in aliases)
+    
+    for relationship in relationships:
+        for endpoint in (relationship['subject'], relationship['object']):
+            type_lower = endpoint['type'].lower()
+            norm_name = _normalize(endpoint['name'])
+            names = known_names.setdefault(type_lower, set())
+            if norm_name in names:
+                continue
+            names.add(norm_name)
+            entity_type = type_keys.setdefault(type_lower, endpoint['type'])
+            entities.setdefault(entity_type, []).append({'name': endpoint['name'], 'referenced_only': True})
+            logger.debug("Adding missing relationship endpoint: %s (%s)", endpoint['name'], entity_type)
+    return entities
+
+@dataclass(frozen=True)
+class AnalysisPayload:
+    """
+    One document analysis ready to be written: everything that does not need the database.
+    
+    Built by prepare_analysis_payload; it only holds plain dicts and lists, so it can
+    be prepared in another process and sent back.
+    """
+    
+    document: Dict[str, Any]
+    entities_by_type: Dict[str, List[Dict]]
+    relationships: List[Dict]
+
+def prepare_analysis_payload(analysis_result: Dict, source_url: str = None) -> AnalysisPayload:
+    """
+    Validate an analysis result and flatten it into an AnalysisPayload.
+    
+    A module-level function so it can run in a ProcessPoolExecutor.
+    
+    Args:
+        analysis_result (Dict): The analysis result from EntityRelationshipExtractor
+        source_url (str, optional): The source URL for web content
+        
+    Returns:
+        AnalysisPayload: Document parameters, entities by type (relationship endpoints
+            included) and relationships
+    """
+    if 'documentAnalysis' not in analysis_result:
+        raise ValueError("Invalid analysis result format: missing documentAnalysis key")
+    doc_analysis = analysis_result['documentAnalysis']
+    relationships = doc_analysis.get('relationships', [])
+    return AnalysisPayload(
+        document=_document_params(doc_analysis.get('metadata', {}), source_url),
+        entities_by_type=_entities_with_missing_endpoints(doc_analysis.get('entities', {}), relationships),
+        relationships=relationships
+    )
+
+def _relationship_rows_by_type(relationships: List[Dict], entity_index: _EntityIndex) -> Dict[str, List[Dict]]:
+    """Resolve relationship endpoints to UUIDs and group the rows by relationship type."""
+    rows_by_type = {}
+    for relationship in relationships:
+        subject_type = relationship['subject']['type']
+        subject_name = relationship['subject']['name']
+        object_type = relationship['object']['type']
+        object_name = relationship['object']['name']
+        subject_uuid = entity_index.find_uuid(subject_type, subject_name)
+        object_uuid = entity_index.find_uuid(object_type, object_name)
+        if not subject_uuid or not object_uuid:
+            logger.warning("Could not find UUIDs for relationship: %s -> %s", subject_name, object_name)
+            continue
+        # Determine relationship type based on source
+        rel_type = "INFERRED" if relationship.get('source') == 'inferred' else "RELATES_TO"
+        rows_by_type.setdefault(rel_type, []).append({
+            'subject_uuid': subject_uuid,
+            'object_uuid': object_uuid,
+            'action': relationship['action'],
+            'source': relationship.get('source', 'explicit'),
+            'category': relationship.get('category')
+        })
+    return rows_by_type
+
+def _ensure_entity_name_type_constraint(session):
+    """Create the (name, type) uniqueness constraint, replacing the old index once nothing blocks it."""
+    if session.run(_ENTITY_NAME_TYPE_CONSTRAINT_EXISTS_QUERY).single()['count']:
+        return
+    if session.run(_DUPLICATE_ENTITIES_QUERY).single()['count']:
+        logger.warning("Duplicate (name, type) entities found; keeping the entity_name_type index")
+        session.run(_ENTITY_NAME_TYPE_INDEX_QUERY).consume()
+        return
+    session.run(_DROP_ENTITY_NAME_TYPE_INDEX_QUERY).consume()
+    try:
+        session.run(_ENTITY_NAME_TYPE_CONSTRAINT_QUERY).consume()
+    except Exception as e:
+        # A duplicate written since the check: put the index back
+        logger.warning("Could not create constraint, using an index instead: %s", e)
+        session.run(_ENTITY_NAME_TYPE_INDEX_QUERY).consume()
+
+def _ensure_schema(driver):
+    """Create the constraints and indexes used by the write path if they do not exist, and backfill Document keys."""
+    try:
+        with driver.session(database=AppConfig.NEO4J_DATABASE) as session:
+            for query in _SCHEMA_QUERIES:
+                session.run(query).consume()
+            _ensure_entity_name_type_constraint(session)
+            session.run(_AWAIT_INDEXES_QUERY).consume()
+    except Exception as e:
+        # Existing data may violate a constraint; storing still works, only slower
+        logger.warning("Could not create Neo4j indexes/constraints: %s", e)
+    
+    # After the indexes are online, so the key lookups use the doc_key index
+    try:
+        with driver.session(database=AppConfig.NEO4J_DATABASE) as session:
+            _log_document_key_backfill(session.run(_BACKFILL_DOCUMENT_KEYS_QUERY).single())
+    except Exception as e:
+        logger.warning("Could not set the key of existing Document nodes: %s", e)
 
 class EntityGraph:
     """Handles storing and retrieving entity and relationship data in Neo4j."""
     
+    # Records pulled per round-trip by reads that stream many rows (driver default: 1000)
+    read_fetch_size = 10_000
+    
+    # Driver shared by every instance in the process (it owns the connection pool)
+    _driver: ClassVar[Optional[Any]] = None
+    _driver_lock: ClassVar[threading.Lock] = threading.Lock()
+    
     def __init__(self):
         """Initialize connection to Neo4j database using configuration."""
-        # Get Neo4j connection details from configuration
-        neo4j_uri = AppConfig.NEO4J_URI
-        neo4j_user = AppConfig.NEO4J_USER
-        neo4j_password = AppConfig.NEO4J_PASSWORD
+        # Bookmarks of the last write, so later reads see it even on a read replica
+        self._last_bookmarks = None
         
-        if not neo4j_password:
-            raise ValueError("NEO4J_PASSWORD no está configurado en el archivo .env")
+        self.driver = EntityGraph._get_driver()
+    
+    @classmethod
+    def _get_driver(cls):
+        """
+        Return the process-wide driver, creating it on first use.
         
-        try:
-            self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-            # Test connection
-            with self.driver.session() as session:
-                result = session.run("RETURN 'Connected to Neo4j' AS message")
-                for record in result:
-                    logger.info(record["message"])
-        except Exception as e:
-            logger.error(f"Failed to connect to Neo4j: {str(e)}")
-            raise ConnectionError(f"Could not connect to Neo4j database: {str(e)}")
+        The first call tests the connection and creates the schema; later
+        instances reuse the driver and its pool without any round-trip.
+        """
+        driver = EntityGraph._driver
+        if driver is not None:
+            return driver
+        
+        with EntityGraph._driver_lock:
+            if EntityGraph._driver is not None:
+                return EntityGraph._driver
+            
+            # Get Neo4j connection details from configuration
+            neo4j_uri = AppConfig.NEO4J_URI
+            neo4j_user = AppConfig.NEO4J_USER
+            neo4j_password = AppConfig.NEO4J_PASSWORD
+            
+            if not neo4j_password:
+                raise ValueError("NEO4J_PASSWORD no está configurado en el archivo .env")
+            
+            driver = None
+            try:
+                driver = GraphDatabase.driver(
+                    neo4j_uri, auth=(neo4j_user, neo4j_password), **_driver_options()
+                )
+                # Test connection
+                with driver.session(database=AppConfig.NEO4J_DATABASE) as session:
+                    result = session.run("RETURN 'Connected to Neo4j' AS message")
+                    for record in result:
+                        logger.info(record["message"])
+            except Exception as e:
+                if driver is not None:
+                    driver.close()
+                logger.error("Failed to connect to Neo4j: %s", e)
+                raise ConnectionError(f"Could not connect to Neo4j database: {str(e)}")
+            
+            _ensure_schema(driver)
+            EntityGraph._driver = driver
+            return driver
     
-    def close(self):
-        """Close the Neo4j driver connection."""
-        if self.driver:
-            self.driver.close()
+    @classmethod
+    def close_driver(cls):
+        """Close the process-wide driver (at application shutdown); the next instance reconnects."""
+        with EntityGraph._driver_lock:
+            driver, EntityGraph._driver = EntityGraph._driver, None
+        if driver is not None:
+            driver.close()
             logger.info("Neo4j connection closed")
     
+    def close(self):
+        """Close the Neo4j driver connection, shared by every EntityGraph in the process."""
+        self.driver = None
+        EntityGraph.close_driver()
+    
+    def read_session(self, **kwargs):
+        """
+        Open a read-only session, routable to a read replica (neo4j:// URIs).
+        
+        The session waits for the bookmarks of the last write made through this
+        instance, so reads always see it.
+        
+        Args:
+            **kwargs: Extra options for driver.session (e.g. fetch_size)
+        """
+        return self.driver.session(
+            database=AppConfig.NEO4J_DATABASE, default_access_mode=READ_ACCESS,
+            bookmarks=self._last_bookmarks, **kwargs
+        )
+    
     def store_analysis_results(self, analysis_result: Dict, source_url: str = None):
         """
         Store document analysis results in Neo4j.
@@ -54,345 +618,166 @@ class EntityGraph:
         Returns:
             str: Document UUID
         """
-        try:
-            if 'documentAnalysis' not in analysis_result:
-                raise ValueError("Invalid analysis result format: missing documentAnalysis key")
-            
-            doc_analysis = analysis_result['documentAnalysis']
-            metadata = doc_analysis.get('metadata', {})
-            
-            # Create document node
-            document_uuid = self._create_document(metadata, source_url)
-            logger.info(f"Created document node with UUID: {document_uuid}")
-            
-            # Process entities
-            entity_uuids = {}
-            all_entities = []  # Store all entity objects for alias lookup
-            for entity_type, entities in doc_analysis.get('entities', {}).items():
-                for entity in entities:
-                    # Handle both string and dictionary entity formats
-                    if isinstance(entity, str):
-                        entity_obj = {"name": entity}
-                    else:
-                        entity_obj = entity
-                    entity_uuid = self._create_entity(entity_obj, entity_type)
-                    # Store with lowercase entity type to match relationship lookup
-                    entity_uuids[(entity_type.lower(), entity_obj['name'])] = entity_uuid
-                    all_entities.append((entity_type.lower(), entity_obj['name'], entity_obj))
-                    self._link_entity_to_document(entity_uuid, document_uuid)
-            
-            # Helper for normalization
-            def normalize(s):
-                import unicodedata
-                s = s.lower()
-                s = unicodedata.normalize('NFKD', s)
-                s = ''.join(c for c in s if not unicodedata.combining(c))
-                # Elimina puntuación y espacios
-                for ch in "-_'\".,:;()[]{} ":
-                    s = s.replace(ch, '')
-                return s
+        return self.store_analysis_results_many([analysis_result], [source_url])[0]
+    
+    def store_analysis_results_many(self, analysis_results: List[Dict], source_urls: List[str] = None,
+                                    batch: int = 50) -> List[str]:
+        """
+        Store several document analyses, grouping up to batch documents per write transaction.
+        
+        Args:
+            analysis_results (List[Dict]): Analysis results from EntityRelationshipExtractor
+            source_urls (List[str], optional): Source URL of each result (None where there is none)
+            batch (int): Maximum number of documents per transaction
             
-            # Helper to find entity object by type and name
-            def find_entity_obj(entity_type, name):
-                for et, ename, eobj in all_entities:
-                    if et == entity_type.lower() and normalize(ename) == normalize(name):
-                        return eobj
-                return None
+        Returns:
+            List[str]: Document UUIDs, in the same order as analysis_results
+        """
+        try:
+            if source_urls is None:
+                source_urls = [None] * len(analysis_results)
+            elif len(source_urls) != len(analysis_results):
+                raise ValueError("source_urls must have one entry per analysis result")
             
-            # Enhanced UUID lookup with alias support and debug logs
-            def find_entity_uuid(entity_type, name):
-                # Normalizar el tipo de entidad para que coincida con el almacenamiento
-                entity_type_lower = entity_type.lower()
-                key = (entity_type_lower, name)
-                norm_name = normalize(name)
-                
-                # Debug: mostrar lo que estamos buscando
-                logger.info(f"[UUID-SEARCH] Buscando: '{name}' (tipo: '{entity_type}', normalizado: '{norm_name}')")
-                
-                # Primero buscar coincidencia exacta
-                if key in entity_uuids:
-                    logger.info(f"[UUID-SEARCH] ✓ Encontrado coincidencia exacta: {entity_uuids[key]}")
-                    return entity_uuids[key]
-                
-                # Debug: mostrar todas las claves disponibles
-                logger.info(f"[UUID-SEARCH] Claves disponibles para tipo '{entity_type}':")
-                for (et, ename), uuid in entity_uuids.items():
-                    if et == entity_type_lower:
-                        logger.info(f"[UUID-SEARCH]   - '{ename}' -> {uuid}")
-                
-                # Buscar por nombre normalizado
-                for (et, ename), uuid in entity_uuids.items():
-                    if et != entity_type_lower:
-                        continue
-                    norm_ename = normalize(ename)
-                    logger.info(f"[UUID-SEARCH] Comparando normalizado: '{norm_name}' vs '{norm_ename}'")
-                    if norm_ename == norm_name:
-                        logger.info(f"[UUID-SEARCH] ✓ Encontrado por normalización: {uuid}")
-                        return uuid
-                
-                # Buscar en aliases (normalizados)
-                for (et, ename), uuid in entity_uuids.items():
-                    if et != entity_type_lower:
-                        continue
-                    entity_obj = find_entity_obj(et, ename)
-                    if entity_obj and 'aliases' in entity_obj:
-                        for alias in entity_obj['aliases']:
-                            norm_alias = normalize(alias)
-                            logger.info(f"[UUID-SEARCH] Comparando alias normalizado: '{norm_name}' vs '{norm_alias}'")
-                            if norm_alias == norm_name:
-                                logger.info(f"[UUID-SEARCH] ✓ Encontrado por alias '{alias}': {uuid}")
-                                return uuid
-                
-                logger.warning(f"[UUID-SEARCH] ✗ No encontrado: '{name}' (tipo: '{entity_type}')")
-                return None
+            # Validate and flatten every document before opening any transaction
+            payloads = [
+                prepare_analysis_payload(analysis_result, source_url)
+                for analysis_result, source_url in zip(analysis_results, source_urls)
+            ]
             
-            # Process relationships
-            for relationship in doc_analysis.get('relationships', []):
-                subject_type = relationship['subject']['type']
-                subject_name = relationship['subject']['name']
-                object_type = relationship['object']['type']
-                object_name = relationship['object']['name']
-                subject_uuid = find_entity_uuid(subject_type, subject_name)
-                object_uuid = find_entity_uuid(object_type, object_name)
-                if not subject_uuid or not object_uuid:
-                    logger.warning(f"Could not find UUIDs for relationship: {subject_name} -> {object_name}")
-                    continue
-                self._create_relationship_with_uuids(relationship, subject_uuid, object_uuid, document_uuid)
-            return document_uuid
+            # One session for all documents and one write transaction per batch
+            document_uuids = []
+            with self.driver.session(database=AppConfig.NEO4J_DATABASE) as session:
+                for payloads_batch in _batches(payloads, batch):
+                    batch_uuids = session.execute_write(self._tx_store_documents, payloads_batch)
+                    _entity_names_cache.invalidate()
+                    document_uuids.extend(batch_uuids)
+                self._last_bookmarks = session.last_bookmarks()
+            return document_uuids
         except Exception as e:
-            logger.error(f"Error storing analysis results: {str(e)}")
+            logger.error("Error storing analysis results: %s", e)
             raise
     
-    def _create_document(self, metadata: Dict, source_url: str = None) -> str:
-        """Create a document node in Neo4j."""
-        with self.driver.session() as session:
-            result = session.write_transaction(self._tx_create_document, metadata, source_url)
-            return result
-    
-    def _tx_create_document(self, tx, metadata: Dict, source_url: str = None) -> str:
-        """Transaction function to create a document node."""
-        # Generate a UUID for the document
-        doc_uuid = str(uuid.uuid4())
-        
-        query = """
-        CREATE (d:Document {
-            uuid: $uuid,
-            title: $title,
-            analysisDate: $analysisDate,
-            language: $language,
-            source_url: $source_url,
-            provider: $provider
-        })
-        RETURN d.uuid AS document_uuid
+    def _tx_store_documents(self, tx, payloads: List[AnalysisPayload]) -> List[str]:
         """
-        result = tx.run(
-            query,
-            uuid=doc_uuid,
-            title=metadata.get('title', 'Untitled'),
-            analysisDate=metadata.get('analysisDate', ''),
-            language=metadata.get('language', 'en'),
-            source_url=source_url,
-            provider=metadata.get('provider', 'unknown')
-        )
-        record = result.single()
-        return record["document_uuid"] if record else None
-    
-    def _create_entity(self, entity: Dict, entity_type: str) -> str:
-        """Create an entity node in Neo4j if it doesn't exist."""
-        entity_name = entity['name']
-        logger.debug(f"Searching for entity: '{entity_name}' in database")
-        with self.driver.session() as session:
-            result = session.write_transaction(self._tx_create_entity, entity, entity_type)
-            logger.info(f"Creating entity: {entity_name} with UUID: {result}")
-            logger.debug(f"Found UUID: {result} for entity: {entity_name}")
-            return result
-    
-    def _tx_create_entity(self, tx, entity: Dict, entity_type: str) -> str:
-        """Transaction function to create an entity node."""
-        # Prepare aliases as a string list for Neo4j
-        aliases = entity.get('aliases', [])
-        if not isinstance(aliases, list):
-            aliases = []
+        Transaction function that stores documents with their entities and relationships.
         
-        # Safely get spanish field
-        spanish = entity.get('spanish', '')
+        Rows of all the documents are merged together: one UNWIND for the documents,
+        one for the entities and their MENTIONED_IN links and one per relationship type.
         
-        query = """
-        MERGE (e:Entity {name: $name, type: $type})
-        ON CREATE SET e.uuid = $uuid
-        SET e.spanish = $spanish,
-            e.aliases = $aliases
-        RETURN e.uuid AS entity_uuid
+        Args:
+            payloads (List[AnalysisPayload]): Prepared documents
+            
+        Returns:
+            List[str]: Document UUIDs
         """
-        # Generate a UUID for new entities
-        entity_uuid = str(uuid.uuid4())
+        # Create (or reuse) the document nodes
+        document_uuids = self._tx_create_documents(tx, [payload.document for payload in payloads])
+        logger.info("Stored %s document nodes", len(document_uuids))
         
-        result = tx.run(
-            query,
-            uuid=entity_uuid,
-            name=entity['name'],
-            type=entity_type,
-            spanish=spanish,
-            aliases=aliases
-        )
-        record = result.single()
+        # Entities of every document, including relationship endpoints missing from the entity lists
+        entity_rows = []
+        for document_uuid, payload in zip(document_uuids, payloads):
+            for entity_type, entity_objs in payload.entities_by_type.items():
+                entity_rows.extend(_entity_rows(entity_objs, entity_type, document_uuid))
         
-        # If no UUID was returned (existing entity without UUID), update it
-        if not record or not record["entity_uuid"]:
-            update_query = """
-            MATCH (e:Entity {name: $name, type: $type})
-            WHERE e.uuid IS NULL
-            SET e.uuid = $uuid
-            RETURN e.uuid AS entity_uuid
-            """
-            update_result = tx.run(
-                update_query,
-                name=entity['name'],
-                type=entity_type,
-                uuid=entity_uuid
-            )
-            update_record = update_result.single()
-            return update_record["entity_uuid"] if update_record else entity_uuid
-            
-        return record["entity_uuid"]
-    
-    def _link_entity_to_document(self, entity_uuid: str, document_uuid: str):
-        """Create a relationship between an entity and a document."""
-        with self.driver.session() as session:
-            session.write_transaction(self._tx_link_entity_to_document, entity_uuid, document_uuid)
-    
-    def _tx_link_entity_to_document(self, tx, entity_uuid: str, document_uuid: str):
-        """Transaction function to link entity to document."""
-        query = """
-        MATCH (e:Entity {uuid: $entity_uuid})
-        MATCH (d:Document {uuid: $document_uuid})
-        MERGE (e)-[r:MENTIONED_IN]->(d)
-        RETURN r
-        """
-        return tx.run(query, entity_uuid=entity_uuid, document_uuid=document_uuid)
-    
-    def _create_relationship_with_uuids(self, relationship: Dict, subject_uuid: str, object_uuid: str, document_uuid: str):
-        """Create a relationship between entities using their UUIDs."""
-        with self.driver.session() as session:
-            session.write_transaction(
-                self._tx_create_relationship_with_uuids, 
-                relationship, 
-                subject_uuid,
-                object_uuid,
-                document_uuid
-            )
-
-    def _tx_create_relationship_with_uuids(self, tx, relationship: Dict, subject_uuid: str, object_uuid: str, document_uuid: str):
-        """Transaction function to create relationships between entities using UUIDs."""
-        # Determine relationship type based on source
-        rel_type = "RELATES_TO"
-        if relationship.get('source') == 'inferred':
-            rel_type = "INFERRED"
-        # Add category if present
-        category_cypher = ", r.category = $category" if 'category' in relationship else ""
-        query = f"""
-        MATCH (s:Entity {{uuid: $subject_uuid}})
-        MATCH (o:Entity {{uuid: $object_uuid}})
-        MERGE (s)-[r:{rel_type}]->(o)
-        SET r.action = $action,
-            r.source = $source{category_cypher}
-        RETURN r
-        """
-        params = {
-            'subject_uuid': subject_uuid,
-            'object_uuid': object_uuid,
-            'action': relationship['action'],
-            'source': relationship.get('source', 'explicit')
-        }
-        if 'category' in relationship:
-            params['category'] = relationship['category']
-        return tx.run(query, **params)
+        # One batched MERGE for the entities of every type and their MENTIONED_IN links;
+        # always run (an index lookup per row) so the UUIDs come from the database itself
+        entity_uuids = self._tx_create_entities_batch(tx, entity_rows)
+        logger.info("Merged %s entities", len(entity_rows))
+        
+        # Resolve relationships per document, against that document's entities only
+        relationship_rows = {}
+        for payload in payloads:
+            entity_index = _EntityIndex()
+            for entity_type, entity_objs in payload.entities_by_type.items():
+                entity_index.add(entity_type, entity_objs, _uuids_by_name(entity_type, entity_objs, entity_uuids))
+            for rel_type, rows in _relationship_rows_by_type(payload.relationships, entity_index).items():
+                relationship_rows.setdefault(rel_type, []).extend(rows)
+        
+        # One batched MERGE per relationship type
+        for rel_type, rows in relationship_rows.items():
+            self._tx_create_relationships_batch(tx, rel_type, rows)
+            logger.info("Merged %s %s relationships", len(rows), rel_type)
+        return document_uuids
+    
+    def _tx_create_documents(self, tx, params: List[Dict]) -> List[str]:
+        """Transaction function to create or update document nodes (_document_params rows) with UNWIND."""
+        uuids_by_key = {}
+        for batch in _batches(params):
+            result = tx.run(_MERGE_DOCUMENTS_QUERY, documents=batch)
+            uuids_by_key.update((record["key"], record["document_uuid"]) for record in result)
+        return [uuids_by_key[document['key']] for document in params]
     
-    def get_entity_graph(self, limit: int = 100):
+    def _tx_create_entities_batch(self, tx, rows: List[Dict]) -> Dict[Tuple[str, str], str]:
+        """Transaction function to create entity nodes of any type, linked to their documents; UUIDs by (type, name)."""
+        entity_uuids = {}
+        for batch in _batches(rows):
+            result = tx.run(_MERGE_ENTITIES_QUERY, rows=batch)
+            entity_uuids.update(((record["type"], record["name"]), record["entity_uuid"]) for record in result)
+        return entity_uuids
+    
+    def _tx_create_relationships_batch(self, tx, rel_type: str, rows: List[Dict]):
+        """Transaction function to create relationships of one type with UNWIND."""
+        for batch in _batches(rows):
+            tx.run(_MERGE_RELATIONSHIPS_QUERIES[rel_type], rows=batch).consume()
+    
+    def get_entity_graph(self, limit: int = 100, after: str = None):
         """
         Retrieve entity graph data from Neo4j.
         
         Args:
             limit (int): Maximum number of entities to retrieve
+            after (str, optional): Cursor of the previous page (its 'next_after');
+                None for the first page
             
         Returns:
-            Dict: Graph data with nodes and links
+            Dict: Graph data with nodes and links, and 'next_after', the cursor of
+                the next page (None on the last page)
+            
+        Raises:
+            Exception: If the query fails (e.g. Neo4j is unreachable or times out)
         """
         try:
-            with self.driver.session() as session:
-                # Get entities
-                entity_query = f"""
-                MATCH (e:Entity)
-                RETURN e.name AS name, e.type AS type, e.uuid AS id, e.spanish AS spanish
-                LIMIT {limit}
-                """
-                entity_result = session.run(entity_query)
-                nodes = []
-                for record in entity_result:
-                    node = {
-                        'id': record['id'],
-                        'name': record['name'],
-                        'type': record['type'],
-                        'spanish': record['spanish'] if record['spanish'] else None
-                    }
-                    nodes.append(node)
-                
-                # Get relationships
-                relationship_query = f"""
-                MATCH (s:Entity)-[r:RELATES_TO]->(t:Entity)
-                WHERE s.uuid IN $entity_ids AND t.uuid IN $entity_ids
-                RETURN s.name AS source_name, s.uuid AS source_id, s.type AS source_type,
-                       t.name AS target_name, t.uuid AS target_id, t.type AS target_type,
-                       r.action AS action, r.category AS category, r.source AS source,
-                       elementId(r) AS relationship_id
-                """
-                entity_ids = [node['id'] for node in nodes]
-                if not entity_ids:
-                    return {'nodes': [], 'links': []}
-                
-                relationship_result = session.run(relationship_query, entity_ids=entity_ids)
-                links = []
-                for record in relationship_result:
-                    link = {
-                        'source': record['source_id'],  # Solo el ID para D3
-                        'target': record['target_id'],  # Solo el ID para D3
-                        'source_name': record['source_name'],
-                        'source_type': record['source_type'],
-                        'target_name': record['target_name'],
-                        'target_type': record['target_type'],
-                        'action': record['action'],
-                        'category': record['category'] or 'unknown',
-                        'source_type': record['source'] or 'explicit',
-                        'id': record['relationship_id']  # ID de la relación para resaltado de caminos
-                    }
-                    links.append(link)
+            with self.read_session() as session:
+                # Entities and the RELATES_TO links among them in one round-trip
+                record = session.run(_ENTITY_GRAPH_QUERY, after=after or '', limit=limit).single()
+                if not record:
+                    return {'nodes': [], 'links': [], 'next_after': None}
+                nodes, links = record['nodes'], record['links']
                 
-                return {'nodes': nodes, 'links': links}
+                # Nodes keep the uuid order of the page: the last id is where the next page starts
+                next_after = nodes[-1]['id'] if len(nodes) == limit else None
+                return {'nodes': nodes, 'links': links, 'next_after': next_after}
                 
         except Exception as e:
-            logger.error(f"Error retrieving entity graph: {str(e)}")
-            return {'nodes': [], 'links': []}
+            # Callers must tell a failed query from an empty database
+            logger.error("Error retrieving entity graph: %s", e)
+            raise
 
-    def get_all_entity_names(self) -> List[str]:
+    def get_all_entity_names(self) -> Tuple[str, ...]:
         """
         Get all entity names from the database for autocomplete.
         
+        The names are cached in-process for a few seconds and dropped on writes,
+        so repeated autocomplete requests do not rescan every entity.
+        
         Returns:
-            List[str]: List of all entity names
+            Tuple[str, ...]: All entity names, sorted
         """
+        names = _entity_names_cache.get()
+        if names is not None:
+            return names
+        
         try:
-            with self.driver.session() as session:
-                query = """
-                MATCH (e:Entity)
-                RETURN DISTINCT e.name AS name
-                ORDER BY e.name
-                """
-                result = session.run(query)
-                names = [record['name'] for record in result]
-                return names
+            with self.read_session(fetch_size=self.read_fetch_size) as session:
+                result = session.run(_ENTITY_NAMES_QUERY)
+                names = tuple(record['name'] for record in result)
+            _entity_names_cache.set(names)
+            return names
         except Exception as e:
-            logger.error(f"Error retrieving entity names: {str(e)}")
-            return []
+            logger.error("Error retrieving entity names: %s", e)
+            return ()
 
     def get_subgraph(self, entity_id: str, depth: int = 3):
         """
@@ -406,58 +791,14 @@ class EntityGraph:
             Dict: Graph data with nodes and links
         """
         try:
-            with self.driver.session() as session:
-                # Get entities within depth using variable length path without shortestPath
-                entity_query = f"""
-                MATCH (start:Entity {{uuid: $entity_id}})
-                MATCH (start)-[:RELATES_TO*0..{depth}]-(e:Entity)
-                RETURN DISTINCT e.name AS name, e.type AS type, e.uuid AS id, e.spanish AS spanish
-                """
-                entity_result = session.run(entity_query, entity_id=entity_id)
-                nodes = []
-                for record in entity_result:
-                    node = {
-                        'id': record['id'],
-                        'name': record['name'],
-                        'type': record['type'],
-                        'spanish': record['spanish'] if record['spanish'] else None
-                    }
-                    nodes.append(node)
-                
-                # Get relationships between these entities
-                if not nodes:
-                    return {'nodes': [], 'links': []}
-                
-                relationship_query = """
-                MATCH (s:Entity)-[r:RELATES_TO]->(t:Entity)
-                WHERE s.uuid IN $entity_ids AND t.uuid IN $entity_ids
-                RETURN s.name AS source_name, s.uuid AS source_id, s.type AS source_type,
-                       t.name AS target_name, t.uuid AS target_id, t.type AS target_type,
-                       r.action AS action, r.category AS category, r.source AS source,
-                       elementId(r) AS relationship_id
-                """
-                entity_ids = [node['id'] for node in nodes]
-                relationship_result = session.run(relationship_query, entity_ids=entity_ids)
-                links = []
-                for record in relationship_result:
-                    link = {
-                        'source': record['source_id'],  # Solo el ID para D3
-                        'target': record['target_id'],  # Solo el ID para D3
-                        'source_name': record['source_name'],
-                        'source_type': record['source_type'],
-                        'target_name': record['target_name'],
-                        'target_type': record['target_type'],
-                        'action': record['action'],
-                        'category': record['category'] or 'unknown',
-                        'source_type': record['source'] or 'explicit',
-                        'id': record['relationship_id']  # ID de la relación para resaltado de caminos
-                    }
-                    links.append(link)
-                
-                return {'nodes': nodes, 'links': links}
+            with self.read_session() as session:
+                # Entities within depth hops (a neighbourhood, so shortestPath does not apply)
+                # and the links among them, in one round-trip
+                record = session.run(_subgraph_query('uuid', depth), entity_id=entity_id).single()
+                return {'nodes': record['nodes'], 'links': record['links']}
                 
         except Exception as e:
-            logger.error(f"Error retrieving subgraph: {str(e)}")
+            logger.error("Error retrieving subgraph: %s", e)
             return {'nodes': [], 'links': []}
 
     def get_subgraph_by_name(self, entity_name: str, depth: int = 3):
@@ -472,25 +813,19 @@ class EntityGraph:
             Dict: Graph data with nodes and links
         """
         try:
-            with self.driver.session() as session:
-                # First find the entity by name
-                find_query = """
-                MATCH (e:Entity {name: $entity_name})
-                RETURN e.uuid AS entity_id
-                LIMIT 1
-                """
-                result = session.run(find_query, entity_name=entity_name)
-                record = result.single()
+            with self.read_session() as session:
+                # Start from the first entity with that name, without a separate lookup
+                record = session.run(_subgraph_query('name', depth), entity_name=entity_name).single()
                 
-                if not record:
-                    logger.warning(f"Entity not found: {entity_name}")
+                # The start entity is always part of its own subgraph
+                if not record['nodes']:
+                    logger.warning("Entity not found: %s", entity_name)
                     return {'nodes': [], 'links': []}
                 
-                entity_id = record['entity_id']
-                return self.get_subgraph(entity_id, depth)
+                return {'nodes': record['nodes'], 'links': record['links']}
                 
         except Exception as e:
-            logger.error(f"Error retrieving subgraph by name: {str(e)}")
+            logger.error("Error retrieving subgraph by name: %s", e)
             return {'nodes': [], 'links': []}
 
     def get_shortest_path(self, from_name: str, to_name: str):
@@ -505,32 +840,14 @@ class EntityGraph:
             Dict: Path information with relationship details
         """
         try:
-            with self.driver.session() as session:
+            with self.read_session() as session:
                 # Check if from and to are the same
                 if from_name.lower().strip() == to_name.lower().strip():
-                    logger.warning(f"Cannot find path between same entity: {from_name}")
+                    logger.warning("Cannot find path between same entity: %s", from_name)
                     return {'path': [], 'relationships': []}
                 
-                # Use variable length pattern with ordering instead of shortestPath
                 # Return both elementId and relationship details for better frontend handling
-                query = """
-                MATCH (from:Entity {name: $from_name})
-                MATCH (to:Entity {name: $to_name})
-                MATCH path = (from)-[:RELATES_TO*1..6]-(to)
-                WITH path, length(path) as pathLength
-                ORDER BY pathLength ASC
-                LIMIT 1
-                RETURN path, 
-                       [rel in relationships(path) | elementId(rel)] AS relationship_ids,
-                       [rel in relationships(path) | {
-                           id: elementId(rel),
-                           source: startNode(rel).name,
-                           target: endNode(rel).name,
-                           action: rel.action,
-                           category: rel.category
-                       }] AS relationships
-                """
-                result = session.run(query, from_name=from_name, to_name=to_name)
+                result = session.run(_SHORTEST_PATH_QUERY, from_name=from_name, to_name=to_name)
                 record = result.single()
                 
                 if record and record['relationship_ids']:
@@ -539,11 +856,11 @@ class EntityGraph:
                         'relationships': record['relationships']
                     }
                 else:
-                    logger.warning(f"No path found between {from_name} and {to_name}")
+                    logger.warning("No path found between %s and %s", from_name, to_name)
                     return {'path': [], 'relationships': []}
                     
         except Exception as e:
-            logger.error(f"Error finding shortest path: {str(e)}")
+            logger.error("Error finding shortest path: %s", e)
             return {'path': [], 'relationships': []}
 
     def reset_database(self, confirm=False):
@@ -561,17 +878,172 @@ class EntityGraph:
             return False
         
         try:
-            with self.driver.session() as session:
-                # Delete all relationships first
-                session.run("MATCH ()-[r]-() DELETE r")
-                logger.info("Deleted all relationships")
+            with self.driver.session(database=AppConfig.NEO4J_DATABASE) as session:
+                # Delete all nodes and their relationships in one pass, in batches to
+                # bound the transaction size
+                session.run(_DELETE_ALL_QUERY).consume()
+                logger.info("Deleted all nodes and relationships")
                 
-                # Delete all nodes
-                session.run("MATCH (n) DELETE n")
-                logger.info("Deleted all nodes")
+                _entity_names_cache.invalidate()
                 
                 return True
                 
         except Exception as e:
-            logger.error(f"Error resetting database: {str(e)}")
-            return False
\ No newline at end of file
+            logger.error("Error resetting database: %s", e)
+            return False
+class AsyncEntityGraph:
+    """
+    Asynchronous write path to Neo4j, for ingesting several documents concurrently.
+    
+    Shares the queries and row preparation with EntityGraph; reads stay on EntityGraph.
+    Call ensure_schema() once before the first write.
+    """
+    
+    def __init__(self):
+        """Create the async Neo4j driver using configuration (no connection is opened yet)."""
+        neo4j_password = AppConfig.NEO4J_PASSWORD
+        if not neo4j_password:
+            raise ValueError("NEO4J_PASSWORD no está configurado en el archivo .env")
+        
+        self.driver = AsyncGraphDatabase.driver(
+            AppConfig.NEO4J_URI, auth=(AppConfig.NEO4J_USER, neo4j_password), **_driver_options()
+        )
+    
+    async def verify_connectivity(self):
+        """Check that the database is reachable."""
+        try:
+            await self.driver.verify_connectivity()
+        except Exception as e:
+            logger.error("Failed to connect to Neo4j: %s", e)
+            raise ConnectionError(f"Could not connect to Neo4j database: {str(e)}")
+    
+    async def ensure_schema(self):
+        """Create the constraints and indexes used by the write path if they do not exist."""
+        try:
+            async with self.driver.session(database=AppConfig.NEO4J_DATABASE) as session:
+                for query in _SCHEMA_QUERIES:
+                    result = await session.run(query)
+                    await result.consume()
+                await self._ensure_entity_name_type_constraint(session)
+                result = await session.run(_AWAIT_INDEXES_QUERY)
+                await result.consume()
+        except Exception as e:
+            logger.warning("Could not create Neo4j indexes/constraints: %s", e)
+        
+        try:
+            async with self.driver.session(database=AppConfig.NEO4J_DATABASE) as session:
+                result = await session.run(_BACKFILL_DOCUMENT_KEYS_QUERY)
+                _log_document_key_backfill(await result.single())
+        except Exception as e:
+            logger.warning("Could not set the key of existing Document nodes: %s", e)
+    
+    async def _ensure_entity_name_type_constraint(self, session):
+        """Async counterpart of _ensure_entity_name_type_constraint."""
+        result = await session.run(_ENTITY_NAME_TYPE_CONSTRAINT_EXISTS_QUERY)
+        if (await result.single())['count']:
+            return
+        result = await session.run(_DUPLICATE_ENTITIES_QUERY)
+        if (await result.single())['count']:
+            logger.warning("Duplicate (name, type) entities found; keeping the entity_name_type index")
+            result = await session.run(_ENTITY_NAME_TYPE_INDEX_QUERY)
+            await result.consume()
+            return
+        result = await session.run(_DROP_ENTITY_NAME_TYPE_INDEX_QUERY)
+        await result.consume()
+        try:
+            result = await session.run(_ENTITY_NAME_TYPE_CONSTRAINT_QUERY)
+            await result.consume()
+        except Exception as e:
+            logger.warning("Could not create constraint, using an index instead: %s", e)
+            result = await session.run(_ENTITY_NAME_TYPE_INDEX_QUERY)
+            await result.consume()
+    
+    async def close(self):
+        """Close the Neo4j driver connection."""
+        if self.driver:
+            await self.driver.close()
+            logger.info("Neo4j connection closed")
+    
+    async def store_analysis_results(self, analysis_result: Dict, source_url: str = None, executor=None):
+        """
+        Store document analysis results in Neo4j.
+        
+        Several calls can be awaited together (e.g. with asyncio.gather); each one
+        uses its own session from the driver's pool.
+        
+        Args:
+            analysis_result (Dict): The analysis result from EntityRelationshipExtractor
+            source_url (str, optional): The source URL for web content
+            executor (Executor, optional): Where to run prepare_analysis_payload, e.g. a
+                ProcessPoolExecutor so large documents are flattened while the event loop
+                keeps other writes going; by default it runs inline
+            
+        Returns:
+            str: Document UUID
+        """
+        try:
+            if executor is None:
+                payload = prepare_analysis_payload(analysis_result, source_url)
+            else:
+                payload = await asyncio.get_running_loop().run_in_executor(
+                    executor, prepare_analysis_payload, analysis_result, source_url
+                )
+        except Exception as e:
+            logger.error("Error storing analysis results: %s", e)
+            raise
+        return await self.store_payload(payload)
+    
+    async def store_payload(self, payload: AnalysisPayload) -> str:
+        """
+        Store a document prepared by prepare_analysis_payload.
+        
+        Args:
+            payload (AnalysisPayload): The prepared document
+            
+        Returns:
+            str: Document UUID
+        """
+        try:
+            async with self.driver.session(database=AppConfig.NEO4J_DATABASE) as session:
+                document_uuid = await session.execute_write(self._tx_store_document, payload)
+            _entity_names_cache.invalidate()
+            return document_uuid
+        except Exception as e:
+            logger.error("Error storing analysis results: %s", e)
+            raise
+    
+    async def _tx_store_document(self, tx, payload: AnalysisPayload) -> str:
+        """Transaction function that stores a document with its entities and relationships."""
+        result = await tx.run(_MERGE_DOCUMENT_QUERY, **payload.document)
+        record = await result.single()
+        document_uuid = record["document_uuid"] if record else None
+        logger.info("Stored document node with UUID: %s", document_uuid)
+        
+        entities_by_type = payload.entities_by_type
+        entity_rows = [
+            row for entity_type, entity_objs in entities_by_type.items()
+            for row in _entity_rows(entity_objs, entity_type, document_uuid)
+        ]
+        entity_uuids = await self._tx_create_entities_batch(tx, entity_rows)
+        logger.info("Merged %s entities", len(entity_rows))
+        
+        entity_index = _EntityIndex()
+        for entity_type, entity_objs in entities_by_type.items():
+            entity_index.add(entity_type, entity_objs, _uuids_by_name(entity_type, entity_objs, entity_uuids))
+        
+        rows_by_type = _relationship_rows_by_type(payload.relationships, entity_index)
+        for rel_type, rows in rows_by_type.items():
+            for batch in _batches(rows):
+                result = await tx.run(_MERGE_RELATIONSHIPS_QUERIES[rel_type], rows=batch)
+                await result.consume()
+            logger.info("Merged %s %s relationships", len(rows), rel_type)
+        return document_uuid
+    
+    async def _tx_create_entities_batch(self, tx, rows: List[Dict]) -> Dict[Tuple[str, str], str]:
+        """Transaction function to create entity nodes of any type, linked to their documents; UUIDs by (type, name)."""
+        entity_uuids = {}
+        for batch in _batches(rows):
+            result = await tx.run(_MERGE_ENTITIES_QUERY, rows=batch)
+            async for record in result:
+                entity_uuids[(record["type"], record["name"])] = record["entity_uuid"]
+        return entity_uuids
@@ -1,5 +1,4 @@
 import argparse
-import json
 import os
 import sys
 from pathlib import Path
@@ -7,6 +6,7 @@ from entity_extractor_improved import EnhancedEntityRelationshipExtractor as Ent
 from web_scraper import fetch_web_content
 from graph_database import EntityGraph
 from config import AppConfig, LLMConfig
+from llm_providers import dumps_json_pretty
 import logging
 
 # Configure logging
@@ -43,11 +43,14 @@ def load_text_file(file_path: str) -> str:
     except Exception as e:
         raise IOError(f"Error reading file: {str(e)}")
 
-def load_pdf_file(file_path: str) -> bytes:
-    """Loads a PDF file in binary mode."""
+def load_pdf_file(file_path: str) -> memoryview:
+    """Loads a PDF file in binary mode into a single preallocated buffer."""
     try:
         with open(file_path, 'rb') as file:
-            return file.read()
+            buffer = bytearray(os.fstat(file.fileno()).st_size)
+            view = memoryview(buffer)
+            read = file.readinto(view)
+            return view[:read] if read < len(buffer) else view
     except FileNotFoundError:
         raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
     except Exception as e:
@@ -74,7 +77,7 @@ def save_output(result: dict, source_name: str, output_dir: str = "output") -> s
     
     # Save the result
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+        f.write(dumps_json_pretty(result))
     
     return output_file
 
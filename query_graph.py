@@ -10,18 +10,14 @@ import logging
 import json
 from tabulate import tabulate
 from graph_database import EntityGraph
-from dotenv import load_dotenv
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-
 def list_entity_types(graph_db):
     """Lista todos los tipos de entidades disponibles con conteo."""
-    with graph_db.driver.session() as session:
+    with graph_db.read_session() as session:
         result = session.run("""
             MATCH (e:Entity)
             RETURN e.type AS type, count(e) AS count
@@ -35,7 +31,7 @@ def list_entity_types(graph_db):
 
 def list_entities_by_type(graph_db, entity_type):
     """Lista todas las entidades de un tipo específico."""
-    with graph_db.driver.session() as session:
+    with graph_db.read_session() as session:
         result = session.run("""
             MATCH (e:Entity)
             WHERE e.type = $type
@@ -61,7 +57,7 @@ def list_entities_by_type(graph_db, entity_type):
 
 def list_documents(graph_db):
     """Lista todos los documentos analizados."""
-    with graph_db.driver.session() as session:
+    with graph_db.read_session() as session:
         result = session.run("""
             MATCH (d:Document)
             OPTIONAL MATCH (e:Entity)-[:MENTIONED_IN]->(d)
@@ -82,7 +78,7 @@ def list_documents(graph_db):
 
 def get_entity_relationships(graph_db, entity_name, show_inferred=True):
     """Muestra todas las relaciones de una entidad específica."""
-    with graph_db.driver.session() as session:
+    with graph_db.read_session() as session:
         # Buscar entidad por nombre (puede haber múltiples con el mismo nombre pero tipo diferente)
         entity_result = session.run("""
             MATCH (e:Entity)
@@ -171,7 +167,7 @@ def get_entity_relationships(graph_db, entity_name, show_inferred=True):
 
 def find_path_between_entities(graph_db, source_name, target_name, max_length=4):
     """Encuentra caminos entre dos entidades."""
-    with graph_db.driver.session() as session:
+    with graph_db.read_session() as session:
         # Buscar entidades por nombre
         source_result = session.run("""
             MATCH (e:Entity)
@@ -240,7 +236,7 @@ def find_path_between_entities(graph_db, source_name, target_name, max_length=4)
 
 def search_entities(graph_db, search_term):
     """Busca entidades por nombre."""
-    with graph_db.driver.session() as session:
+    with graph_db.read_session() as session:
         result = session.run("""
             MATCH (e:Entity)
             WHERE toLower(e.name) CONTAINS toLower($term) OR 
@@ -270,7 +266,7 @@ def search_entities(graph_db, search_term):
 
 def export_graph(graph_db, filename, include_inferred=True):
     """Exporta el grafo completo a un archivo JSON."""
-    with graph_db.driver.session() as session:
+    with graph_db.read_session() as session:
         # Obtener todos los nodos
         nodes_result = session.run("""
             MATCH (e:Entity)
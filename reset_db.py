@@ -8,15 +8,11 @@ import argparse
 import sys
 import logging
 from graph_database import EntityGraph
-from dotenv import load_dotenv
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-
 def main():
     parser = argparse.ArgumentParser(
         description="Resetea la base de datos Neo4j, eliminando todos los nodos y relaciones."
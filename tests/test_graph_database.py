@@ -0,0 +1,92 @@
+"""
+Tests of the EntityGraph write path, with an in-memory transaction in place of Neo4j.
+
+FakeTransaction applies the MERGE semantics of the write queries to plain dicts,
+so the rows built by graph_database can be checked without a running server.
+"""
+
+import unittest
+
+import graph_database
+from graph_database import EntityGraph, prepare_analysis_payload
+
+
+class FakeResult(list):
+    def consume(self):
+        pass
+
+
+class FakeTransaction:
+    """Documents and entities written by the queries, kept across transactions."""
+
+    def __init__(self):
+        self.documents = {}  # key -> uuid
+        self.entities = {}   # (type, name) -> properties
+
+    def run(self, query, **params):
+        if query is graph_database._MERGE_DOCUMENTS_QUERY:
+            return FakeResult(
+                {'key': doc['key'], 'document_uuid': self.documents.setdefault(doc['key'], doc['uuid'])}
+                for doc in params['documents']
+            )
+        if query is graph_database._MERGE_ENTITIES_QUERY:
+            records = FakeResult()
+            for row in params['rows']:
+                entity = self.entities.setdefault((row['type'], row['name']), {'uuid': row['uuid']})
+                # SET e.spanish = coalesce(row.spanish, e.spanish, ''), likewise for aliases
+                entity['spanish'] = next(v for v in (row['spanish'], entity.get('spanish'), '') if v is not None)
+                entity['aliases'] = next(v for v in (row['aliases'], entity.get('aliases'), []) if v is not None)
+                records.append({'type': row['type'], 'name': row['name'], 'entity_uuid': entity['uuid']})
+            return records
+        return FakeResult()
+
+
+def analysis(title, entities, relationships=()):
+    return {'documentAnalysis': {
+        'metadata': {'title': title},
+        'entities': entities,
+        'relationships': list(relationships)
+    }}
+
+
+class StoreDocumentsTest(unittest.TestCase):
+
+    def setUp(self):
+        # No driver: only the transaction functions are exercised
+        self.graph = EntityGraph.__new__(EntityGraph)
+        self.tx = FakeTransaction()
+
+    def store(self, analysis_result, source_url=None):
+        payload = prepare_analysis_payload(analysis_result, source_url)
+        return self.graph._tx_store_documents(self.tx, [payload])
+
+    def test_relationship_endpoint_keeps_stored_properties(self):
+        self.store(analysis('First', {'Person': [
+            {'name': 'Ana', 'spanish': 'Ana', 'aliases': ['Anita']}
+        ]}))
+
+        # Ana is only named by a relationship here, not extracted as an entity
+        self.store(analysis('Second', {'Organization': ['ACME']}, [{
+            'subject': {'type': 'Person', 'name': 'Ana'},
+            'action': 'works at',
+            'object': {'type': 'Organization', 'name': 'ACME'}
+        }]))
+
+        ana = self.tx.entities[('Person', 'Ana')]
+        self.assertEqual(ana['spanish'], 'Ana')
+        self.assertEqual(ana['aliases'], ['Anita'])
+
+    def test_new_relationship_endpoint_gets_empty_properties(self):
+        self.store(analysis('Only', {'Organization': ['ACME']}, [{
+            'subject': {'type': 'Person', 'name': 'Bob'},
+            'action': 'founded',
+            'object': {'type': 'Organization', 'name': 'ACME'}
+        }]))
+
+        bob = self.tx.entities[('Person', 'Bob')]
+        self.assertEqual(bob['spanish'], '')
+        self.assertEqual(bob['aliases'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,16 @@
 from flask import Flask, render_template, jsonify, request
 from graph_database import EntityGraph
 from config import AppConfig
+import atexit
 import os
 import logging
 
 app = Flask(__name__)
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 
+# Todas las peticiones comparten el driver de Neo4j; se cierra al terminar el proceso
+atexit.register(EntityGraph.close_driver)
+
 # Create templates directory and HTML file if not exists
 os.makedirs('templates', exist_ok=True)
 with open('templates/index.html', 'w') as f:
@@ -1158,25 +1162,23 @@ def get_graph():
         # Obtener parámetros de filtro
         entity_types = request.args.getlist('entity_type')
         relation_types = request.args.getlist('relation_type')
+        # Cursor de paginación: el 'next_after' devuelto por la página anterior
+        after = request.args.get('after')
         
         # Conectar a la base de datos
         graph_db = EntityGraph()
         
-        # Verificar si hay datos en la base de datos
-        with graph_db.driver.session() as session:
-            # Contar entidades
-            count_result = session.run("MATCH (e:Entity) RETURN count(e) as count")
-            entity_count = count_result.single()["count"]
-            
-            if entity_count == 0:
-                return jsonify({
-                    "nodes": [],
-                    "links": [],
-                    "message": "La base de datos está vacía. Analiza un documento primero usando: python main.py --file/--url/--pdf <archivo> --store-db"
-                })
+        # Obtener datos del grafo (nodos y enlaces en una sola consulta)
+        graph_data = graph_db.get_entity_graph(limit=1000, after=after)
         
-        # Obtener datos del grafo con filtros
-        graph_data = graph_db.get_entity_graph(limit=1000)
+        # Sin entidades en la primera página: la base de datos está vacía (sin consulta de recuento aparte).
+        # Si la consulta falla, get_entity_graph lanza la excepción y se responde con el error
+        if not after and not graph_data.get('nodes'):
+            return jsonify({
+                "nodes": [],
+                "links": [],
+                "message": "La base de datos está vacía. Analiza un documento primero usando: python main.py --file/--url/--pdf <archivo> --store-db"
+            })
         
         # Aplicar filtros si se especifican
         if entity_types: